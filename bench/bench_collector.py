@@ -0,0 +1,49 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 循环内 pd.concat 累加 vs Collector 一次合并 基准测试
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.collector import Collector
+
+
+def make_frames(count, rows=250):
+    rng = np.random.default_rng(0)
+    return [
+        pd.DataFrame({
+            "TradingDay": np.arange(rows).astype(str),
+            "SecurityID": f"{600000 + i}",
+            "ClosePrice": rng.random(rows),
+            "Volume": rng.integers(0, 10 ** 6, rows)
+        }) for i in range(count)
+    ]
+
+
+def concat_in_loop(frames):
+    eod = pd.DataFrame()
+    for df in frames:
+        eod = pd.concat([eod, df])
+    return eod
+
+
+def collect(frames):
+    eod = Collector()
+    for df in frames:
+        eod.append(df)
+    return eod.result()
+
+
+if __name__ == "__main__":
+    for count in [250, 500, 1000, 2000]:
+        frames = make_frames(count)
+        assert concat_in_loop(frames).equals(collect(frames))
+        t_loop = min(timeit.repeat(lambda: concat_in_loop(frames), number=1, repeat=3))
+        t_collect = min(timeit.repeat(lambda: collect(frames), number=1, repeat=3))
+        print(f"{count:>5} frames  concat in loop {t_loop * 1e3:8.1f} ms  collector {t_collect * 1e3:6.1f} ms  x{t_loop / t_collect:.0f}")
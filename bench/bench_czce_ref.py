@@ -0,0 +1,71 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 郑商所期权参考数据解析 基准测试, 逐行 re.match / apply vs str.extract 整列
+      python bench/bench_czce_ref.py [OptionDataReferenceData.xml]  不给路径时生成模拟文件
+"""
+import re
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from exch.czce import Option
+
+COLUMNS = ["CtrCd", "PrdCd", "CtrSz", "TckSz", "MnthPosLmt", "FrstTrdDt", "LstTrdDt", "SettleDt", "CallPutTp", "StrikePx", "ExerStyleTp", "SettleTp"]
+
+
+def make_ref(rows) -> bytes:
+    rng = np.random.default_rng(0)
+    products = rng.choice(["SR", "CF", "TA", "MA", "RM", "OI", "PK", "AP"], rows)
+    strikes = rng.integers(10, 2000, rows) * 5
+    df = pd.DataFrame({
+        "CtrCd": [f"{p}{m}{c}{k}" for p, m, c, k in zip(products, rng.choice(["401", "403", "405"], rows), rng.choice(["C", "P"], rows), strikes)],
+        "PrdCd": products,
+        "CtrSz": rng.choice(["5吨/手", "10吨/手", "20吨/手"], rows),
+        "TckSz": rng.choice(["0.5元/吨", "1.0元/吨", "2.0元/吨"], rows),
+        "MnthPosLmt": [f"单边持仓{v}手" for v in rng.integers(100, 20000, rows)],
+        "FrstTrdDt": "2023-06-01",
+        "LstTrdDt": "2023-12-08",
+        "SettleDt": "2023-12-08",
+        "CallPutTp": rng.choice(["看涨", "看跌"], rows),
+        "StrikePx": [f"{v:,}" for v in strikes],
+        "ExerStyleTp": "美式",
+        "SettleTp": "实物",
+    })
+    # one row per product where CtrCd == PrdCd, dropped by the parser
+    df = pd.concat([df, pd.DataFrame({**{c: df[c].iloc[:1].tolist() for c in COLUMNS}, "CtrCd": ["SR"], "PrdCd": ["SR"]})], ignore_index=True)
+    return df.to_xml(index=False, root_name="OptionDataReferenceData", row_name="ContractData").encode("utf-8")
+
+
+def old(option, content):
+    ref = pd.read_xml(BytesIO(content))
+    ref = ref[COLUMNS]
+    ref.columns = option.ref_columns[:-2]
+    ref.drop(index=ref[ref["InstrumentID"] == ref["ProductID"]].index, inplace=True)
+    ref["Unit"] = ref["Unit"].map(lambda x: re.match("(\\d+)(\\D+)", x)[1])
+    ref["TickSize"] = ref["TickSize"].map(lambda x: re.match("(\\d+\\.?\\d+)(\\D+)", x)[1])
+    ref["PositionLimit"] = ref["PositionLimit"].map(lambda x: re.match("(\\D+)(\\d+)(\\D+)", x)[2])
+    ref["CallPut"] = ref["CallPut"].map(lambda x: "C" if x.strip() == "看涨" else "P")
+    ref["StrikePrice"] = ref["StrikePrice"].map(lambda x: x.replace(",", ""))
+    ref["ExecType"] = ref["ExecType"].map(lambda x: "American" if x.strip() == "美式" else "European")
+    ref["DeliveryMethod"] = ref["ExecType"].map(lambda x: "Physical" if x.strip() == "实物" else "Cash")
+    ref["Underlying"] = ref.apply(lambda x: x["InstrumentID"][:len(x["ProductID"]) + 3], axis=1)
+    ref["Margin"] = ref.apply(lambda x: None, axis=1)
+    for column in ["FirstTradingDay", "LastTradingDay", "LastDeliveryDay"]:
+        ref[column] = ref[column].map(lambda x: x.replace("-", ""))
+    return ref
+
+
+if __name__ == "__main__":
+    option = Option()
+    name, content = (sys.argv[1], Path(sys.argv[1]).read_bytes()) if len(sys.argv) > 1 else ("generated", make_ref(30000))
+    expected, result = old(option, content), option.parse_ref(content)
+    assert expected.equals(result) and (expected.dtypes == result.dtypes).all()
+    t_old = min(timeit.repeat(lambda: old(option, content), number=1, repeat=3))
+    t_new = min(timeit.repeat(lambda: option.parse_ref(content), number=1, repeat=3))
+    print(f"{Path(name).name:<32} {len(result):>6} rows  map/apply {t_old * 1e3:7.1f} ms  str.extract {t_new * 1e3:6.1f} ms  x{t_old / t_new:.1f}")
@@ -0,0 +1,70 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: JSONP / JSON 解码建表 基准测试, str split + json.loads + 全字段建表 vs bytes 解包 + orjson + 只建用到的列
+"""
+import sys
+import json
+import timeit
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.decode import jsonp, loads, orjson
+
+LIST_COLUMNS = ["InstrumentID", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
+# fields an eod parser keeps out of the 24 in a record
+RECORD_COLUMNS = [f"FIELD{i}" for i in range(11)]
+
+
+def make_list(rows) -> bytes:
+    # /v1/sh1/list/exchange/equity, one row per instrument
+    rng = np.random.default_rng(0)
+    price = rng.integers(100, 100000, (rows, 4)) / 100
+    data = {
+        "date": 20231009,
+        "time": 150000,
+        "total": rows,
+        "list": [[f"{600000 + i}", *price[i].tolist(), int(rng.integers(0, 10 ** 9)), float(rng.integers(0, 10 ** 11))] for i in range(rows)]
+    }
+    return b"jsonpCallback62585600(" + json.dumps(data, ensure_ascii=False).encode("utf-8") + b")"
+
+
+def make_records(rows) -> bytes:
+    # SHFE / GFEX style list of dicts
+    rng = np.random.default_rng(0)
+    keys = [f"FIELD{i}" for i in range(24)]
+    data = {"o_curinstrument": [{key: str(v) for key, v in zip(keys, rng.integers(0, 10 ** 6, len(keys)).tolist())} for _ in range(rows)]}
+    return json.dumps(data).encode("utf-8")
+
+
+def old_list(content):
+    data = json.loads(content.decode("utf-8").split("(")[1][:-1])
+    return pd.DataFrame(data["list"], columns=LIST_COLUMNS)
+
+
+def new_list(content):
+    return pd.DataFrame(jsonp(content)["list"], columns=LIST_COLUMNS)
+
+
+def old_records(content):
+    return pd.DataFrame(json.loads(content.decode("utf-8"))["o_curinstrument"])[RECORD_COLUMNS]
+
+
+def new_records(content):
+    return pd.DataFrame(loads(content)["o_curinstrument"], columns=RECORD_COLUMNS)
+
+
+if __name__ == "__main__":
+    print(f"parser: {'orjson' if orjson else 'json'}")
+    for name, make, old, new, rows in [
+        ("sse list", make_list, old_list, new_list, 20000),
+        ("records", make_records, old_records, new_records, 5000),
+    ]:
+        content = make(rows)
+        assert old(content).equals(new(content))
+        t_old = min(timeit.repeat(lambda: old(content), number=1, repeat=5))
+        t_new = min(timeit.repeat(lambda: new(content), number=1, repeat=5))
+        print(f"{name:<9} {len(content) / 1e6:5.1f} MB  old {t_old * 1e3:7.1f} ms  new {t_new * 1e3:6.1f} ms  x{t_old / t_new:.1f}")
@@ -0,0 +1,55 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 深交所 xlsx 行情导出读取 基准测试, openpyxl 全列 vs tools.excel (已安装的最快引擎) 只读用到的列
+      python bench/bench_excel.py [saved stock export ...]  不给路径时生成模拟导出
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from io import BytesIO
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from exch.sze import Stock
+from tools.excel import available, read_excel
+
+
+def make_export(rows) -> bytes:
+    # 1815_stock_snapshot tab1, numbers come as text with thousands separators
+    rng = np.random.default_rng(0)
+    price = rng.integers(100, 100000, (rows, 5)) / 100
+    df = pd.DataFrame({
+        "交易日期": "2023-10-09",
+        "证券代码": [f"{i:06d}" for i in range(1, rows + 1)],
+        "证券简称": [f"股票{i}" for i in range(rows)],
+        "前收": price[:, 0], "开盘": price[:, 1], "最高": price[:, 2], "最低": price[:, 3], "今收": price[:, 4],
+        "涨跌幅（%）": np.round((price[:, 4] / price[:, 0] - 1) * 100, 2),
+        "成交量(万股)": [f"{v:,.2f}" for v in rng.integers(0, 10 ** 8, rows) / 100],
+        "成交金额(万元)": [f"{v:,.2f}" for v in rng.integers(0, 10 ** 10, rows) / 100],
+        "市盈率": np.round(rng.random(rows) * 100, 2),
+    })
+    buf = BytesIO()
+    df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+
+def old(content):
+    return pd.read_excel(BytesIO(content), engine="openpyxl")
+
+
+if __name__ == "__main__":
+    stock = Stock()
+    exports = [(path, Path(path).read_bytes()) for path in sys.argv[1:]] or [("generated", make_export(3000))]
+    print(f"engines: {', '.join(available())}")
+    for name, content in exports:
+        expected = stock.parse(old(content))
+        t_old = min(timeit.repeat(lambda: old(content), number=1, repeat=3))
+        line = f"{Path(name).name:<24} {len(content) / 1e6:5.2f} MB  openpyxl all {t_old * 1e3:7.1f} ms"
+        for engine in available():
+            assert stock.parse(read_excel(content, usecols=stock.raw_columns, engine=engine)).equals(expected)
+            t_new = min(timeit.repeat(lambda: read_excel(content, usecols=stock.raw_columns, engine=engine), number=1, repeat=3))
+            line += f"  {engine} usecols {t_new * 1e3:7.1f} ms x{t_old / t_new:.1f}"
+        print(line)
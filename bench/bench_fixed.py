@@ -0,0 +1,43 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 四舍五入 基准测试, new_round 逐行 vs 定点数向量化
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from math import floor
+from pathlib import Path
+from decimal import Decimal
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.fixed import round_half_up, round_tick
+from tools.helper import new_round
+
+if __name__ == "__main__":
+    rows = 100000
+    rng = np.random.default_rng(0)
+    price = pd.Series(rng.integers(1000, 10000000, rows) / 1000)
+    tick = pd.Series(rng.choice([0.5, 1.0, 5.0, 0.01], rows))
+
+    def per_row():
+        return price.map(lambda x: new_round(x))
+
+    def vectorized():
+        return round_half_up(price.values)
+
+    def per_row_tick():
+        ticks = [Decimal(str(t)) for t in tick]
+        return pd.Series([new_round(floor(Decimal(str(p)) / t) * t) for p, t in zip(price, ticks)])
+
+    def vectorized_tick():
+        return round_tick(price.values, tick.values)
+
+    assert (per_row().astype(float).values == vectorized()).all()
+    assert (per_row_tick().astype(float).values == vectorized_tick()).all()
+    for name, slow, fast in [("round", per_row, vectorized), ("tick floor", per_row_tick, vectorized_tick)]:
+        t_slow = min(timeit.repeat(slow, number=1, repeat=3))
+        t_fast = min(timeit.repeat(fast, number=1, repeat=3))
+        print(f"{name:<12} {rows} rows  per-row {t_slow * 1e3:8.1f} ms  vectorized {t_fast * 1e3:6.1f} ms  x{t_slow / t_fast:.0f}")
@@ -0,0 +1,125 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 港交所 d{YYMMDD}c.htm 解析 基准测试, 原逐段多次扫描 vs 单遍流式解析
+      python bench/bench_hkg_quotation.py [saved page]  不给路径时生成模拟页面
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from collections import defaultdict
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from exch.hkg import OPEN_SEP, PAGE_BREAK, QUOTE_SEP, Stock
+
+
+class Page:
+    """stands in for a stream=True response"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.text = content.decode("gbk", errors="replace")
+        self.encoding = "gbk"
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+def make_page(count=3000) -> bytes:
+    rng = np.random.default_rng(0)
+    lines = ["<html><pre><font size='1'>", "香港交易所 每日报表", OPEN_SEP, "开市前成交", OPEN_SEP, "代号 名称", "", "成交"]
+    for code in range(1, count + 1):
+        flag = "P" if code % 4 == 0 else ""
+        price = rng.integers(100, 100000) / 100
+        lines.append(f"{code:>5} 股票{code:<8} <{flag}{rng.integers(1, 10) * 1000:,}-{price:.2f} {rng.integers(1, 10) * 500:,}-{price + 0.05:.2f}")
+        if code % 5 == 0:
+            lines.append(f"      {rng.integers(1, 10) * 1000:,}-{price:.2f}")
+        if code % 50 == 0:
+            lines.append(PAGE_BREAK)
+    lines += ["", OPEN_SEP, "", QUOTE_SEP, "代号", "名称", "货币", "前收", "买入/卖出", "最高/最低"]
+    for code in range(1, count + 1):
+        pre = rng.integers(1000, 100000) / 1000
+        star = "*" if code % 7 == 0 else " "
+        if code % 97 == 0:
+            lines.append(f"{star}{code:>5} 股票{code:<8} HKD {pre:.3f} TRADING SUSPENDED")
+            continue
+        bid = "N/A" if code % 13 == 0 else f"{pre:.3f}"
+        volume = "-" if code % 17 == 0 else f"{rng.integers(0, 10 ** 9):,}"
+        lines.append(f"{star}{code:>5}#{code % 3} 股票{code:<8} HKD {pre:.3f} {bid} {pre + 0.01:.3f} {pre + 0.2:.3f} {pre - 0.2:.3f} {pre + 0.1:.3f} {volume} {rng.integers(0, 10 ** 10):,}")
+    lines += [QUOTE_SEP, "合计", QUOTE_SEP, "</font></pre></html>", ""]
+    return "\r\n".join(lines).encode("gbk")
+
+
+def old_get_open(resp) -> pd.DataFrame:
+    lines = resp.text.split("\r\n")
+    sep_index = [index for (index, value) in enumerate(lines) if value == OPEN_SEP]
+    raw = [line.replace(PAGE_BREAK, "") for line in lines[sep_index[1] + 4:sep_index[2] - 1]]
+    raw_records = defaultdict(str)
+    for line in raw:
+        if "<" in line and not line.startswith("      "):
+            instrumentid = line.split()[0].zfill(5)
+            raw_records[instrumentid] += line.lstrip()
+    records = []
+    for instrumentid, trans in raw_records.items():
+        op = "0.0"
+        record = []
+        trans = trans.replace(",", "")
+        for i in trans.split():
+            if "-" in i and i.split("-")[1].replace(".", "").isdigit():
+                record.append(i)
+        for pv in record:
+            if pv[0] in ["P", "D", "Y"]:
+                continue
+            op = pv.split("-")[1]
+            break
+        records.append([instrumentid, op])
+    return pd.DataFrame(records, columns=["InstrumentID", "OpenPrice"]).set_index("InstrumentID")
+
+
+def old_get_eod(resp, date) -> pd.DataFrame:
+    ops = old_get_open(resp)
+    lines = resp.text.split("\r\n")
+    sep_index = [index for (index, value) in enumerate(lines) if value == QUOTE_SEP]
+    raw = [line.lstrip("*").replace(PAGE_BREAK, "") for line in lines[sep_index[-3] + 7:sep_index[-2]]]
+    records = []
+    for line in raw:
+        instrumentid = line.split()[0].strip().split("#")[0].zfill(5)
+        tmp = line.split()
+        if "TRADING SUSPENDED" in line or "TRADING HALTED" in line:
+            record = [instrumentid, date, tmp[-4], "0.0", "0.0", "0.0", "0.0", "0.0", "0.0", "0.0", "0.0"]
+        else:
+            record = [instrumentid, date] + tmp[-9:]
+        records.append(record)
+    columns = ["InstrumentID", "TradingDay", "Currency", "PreClosePrice", "BidPrice", "AskPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
+    eod = pd.DataFrame(records, columns=columns)
+    for column in eod.columns[3:]:
+        eod[column] = eod[column].map(lambda x: x.strip().replace("N/A", "0.0").replace("-", "0.0").replace(",", ""))
+    eod["OpenPrice"] = eod["InstrumentID"].map(lambda x: ops.loc[x, "OpenPrice"] if x in ops.index else "0.0")
+    return eod
+
+
+def new_get_eod(stock, resp, date) -> pd.DataFrame:
+    # Stock.get_eod minus the download and csv dump
+    quotes, ops = stock.parse_quotation(iter_lines(resp, "gbk"))
+    eod = pd.DataFrame(quotes)
+    eod["TradingDay"] = date
+    eod["OpenPrice"] = eod["InstrumentID"].map(ops["OpenPrice"]).fillna(0.0)
+    return eod
+
+
+if __name__ == "__main__":
+    from tools.session import iter_lines
+
+    content = Path(sys.argv[1]).read_bytes() if len(sys.argv) > 1 else make_page()
+    page, date, stock = Page(content), "20231009", Stock()
+    old, new = old_get_eod(page, date), new_get_eod(stock, page, date)
+    columns = [column for column in stock.eod_columns if column not in ["InstrumentID", "TradingDay", "Currency"]]
+    assert (old[["InstrumentID", "Currency"]].values == new[["InstrumentID", "Currency"]].values).all()
+    assert (old[columns].astype(float).values == new[columns].astype(float).values).all()
+    t_old = min(timeit.repeat(lambda: old_get_eod(Page(content), date), number=1, repeat=5))
+    t_new = min(timeit.repeat(lambda: new_get_eod(stock, Page(content), date), number=1, repeat=5))
+    print(f"{len(content) / 1e6:.1f} MB, {len(new)} quotes  old {t_old * 1e3:7.1f} ms  one pass {t_new * 1e3:6.1f} ms  x{t_old / t_new:.1f}")
@@ -0,0 +1,81 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 文本数字清洗 基准测试, 逐格 map(lambda) vs tools.normalize 整列 str / to_numeric
+"""
+import sys
+import timeit
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.normalize import decimal, strip
+
+
+def make_sze(rows) -> pd.DataFrame:
+    # Stock tab after column renaming, codes as read from the sheet
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "InstrumentID": rng.integers(1, 400000, rows),
+        "TradingDay": "2023-10-09",
+        "Volume": [f"{v:,.2f}" for v in rng.integers(0, 10 ** 8, rows) / 100],
+        "Turnover": [f"{v:,.2f}" for v in rng.integers(0, 10 ** 10, rows) / 100],
+    })
+
+
+def make_czce(rows) -> pd.DataFrame:
+    # FutureDataDaily.xls, every cell is text, 今结算 empty on the summary rows
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({column: [f"{v:,.2f}" for v in rng.integers(0, 10 ** 9, rows) / 100] for column in range(10)})
+    df.loc[::20, 7] = np.nan
+    return df
+
+
+def old_sze(df):
+    df = df.copy()
+    df["InstrumentID"] = df["InstrumentID"].map(lambda x: str(x).zfill(6))
+    df["TradingDay"] = df["TradingDay"].map(lambda x: x.replace("-", ""))
+    df["Volume"] = df["Volume"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
+    df["Turnover"] = df["Turnover"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
+    return df
+
+
+def new_sze(df):
+    df = df.copy()
+    df["InstrumentID"] = df["InstrumentID"].astype(str).str.zfill(6)
+    df["TradingDay"] = strip(df["TradingDay"], "-")
+    df["Volume"] = decimal(df["Volume"], 4)
+    df["Turnover"] = decimal(df["Turnover"], 4)
+    return df
+
+
+def old_czce(df):
+    df = df.copy()
+    for column in df.columns:
+        df[column] = df[column].map(lambda x: x.replace(",", "") if not pd.isna(x) else x)
+    df[8] = df[8].map(lambda x: Decimal(str(x)) * 10000)
+    return df
+
+
+def new_czce(df):
+    df = df.copy()
+    for column in df.columns:
+        df[column] = strip(df[column])
+    df[8] = decimal(df[8], 4)
+    return df
+
+
+if __name__ == "__main__":
+    for name, make, old, new, rows in [
+        ("sze stock", make_sze, old_sze, new_sze, 50000),
+        ("czce eod", make_czce, old_czce, new_czce, 20000),
+    ]:
+        df = make(rows)
+        expected, result = old(df), new(df)
+        assert expected.equals(result) and expected.astype(str).equals(result.astype(str))
+        t_old = min(timeit.repeat(lambda: old(df), number=1, repeat=5))
+        t_new = min(timeit.repeat(lambda: new(df), number=1, repeat=5))
+        print(f"{name:<10} {rows:>6} rows  map {t_old * 1e3:7.1f} ms  vectorized {t_new * 1e3:6.1f} ms  x{t_old / t_new:.1f}")
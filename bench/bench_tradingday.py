@@ -0,0 +1,48 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 交易日历查询 基准测试, 列表扫描 vs 索引
+"""
+import sys
+import timeit
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.tradingday import CN_TradingDay
+
+
+def scan_get_pre(days, day):
+    if day not in days:
+        raise Exception(f"{day} not in tradingdays")
+    return days[days.index(day) - 1]
+
+
+def scan_get_month_end(days, day):
+    index = days.index(day)
+    month_end = day
+    for date in days[index:]:
+        if day[:6] == date[:6]:
+            month_end = date
+        else:
+            return month_end
+
+
+if __name__ == "__main__":
+    cn_tradingday = CN_TradingDay()
+    days = [str(day) for day in cn_tradingday._days]
+    sample = days[::len(days) // 1000][:1000]
+    number = 5
+
+    cases = [
+        ("get_pre", lambda: [scan_get_pre(days, d) for d in sample], lambda: [cn_tradingday.get_pre(d) for d in sample]),
+        ("get_month_end", lambda: [scan_get_month_end(days, d) for d in sample], lambda: [cn_tradingday.get_month_end(d) for d in sample]),
+    ]
+    for name, scan, indexed in cases:
+        assert scan() == indexed()
+        t_scan = min(timeit.repeat(scan, number=number, repeat=3)) / number
+        t_indexed = min(timeit.repeat(indexed, number=number, repeat=3)) / number
+        print(f"{name:<16} {len(sample)} calls  scan {t_scan * 1e3:9.2f} ms  indexed {t_indexed * 1e3:7.2f} ms  x{t_scan / t_indexed:.0f}")
+
+    list_bytes = sys.getsizeof(days) + sum(sys.getsizeof(day) for day in days)
+    print(f"memory           str list {list_bytes / 1024:9.1f} KB  int32 {cn_tradingday._days.nbytes / 1024:9.1f} KB")
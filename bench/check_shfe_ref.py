@@ -0,0 +1,58 @@
+# -* - coding: UTF-8 -* -
+"""
+Date: 2026/10/18
+Desc: 上期所期货参考数据 一致性检查, fixed 模式与默认模式 get_ref 输出必须相同 (模拟响应, 不联网)
+"""
+import sys
+import json
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from exch.shfe import Futures
+from tools.cache import eod_cache
+
+RESPONSES = {
+    "ContractBaseInfo": {"ContractBaseInfo": [
+        {"INSTRUMENTID": "cu2311", "BASISPRICE": "68000", "OPENDATE": "20221115", "EXPIREDATE": "20231115", "STARTDELIVDATE": "20231116", "ENDDELIVDATE": "20231120"},
+        {"INSTRUMENTID": "au2312", "BASISPRICE": "400", "OPENDATE": "20221215", "EXPIREDATE": "20231215", "STARTDELIVDATE": "20231218", "ENDDELIVDATE": "20231220"},
+        {"INSTRUMENTID": "al2410", "BASISPRICE": "18750", "OPENDATE": "20231016", "EXPIREDATE": "20241015", "STARTDELIVDATE": "20241016", "ENDDELIVDATE": "20241018"},
+    ]},
+    "ContractDailyTradeArgument": {"ContractDailyTradeArgument": [
+        {"INSTRUMENTID": "cu2311", "UPPER_VALUE": "0.07", "LOWER_VALUE": "0.07"},
+        {"INSTRUMENTID": "au2312", "UPPER_VALUE": "0.1", "LOWER_VALUE": "0.1"},
+        {"INSTRUMENTID": "al2410", "UPPER_VALUE": "0.05", "LOWER_VALUE": "0.05"},
+    ]},
+    "kx": {"o_curinstrument": [
+        {"PRODUCTGROUPID": "cu  ", "DELIVERYMONTH": "2311", "OPENPRICE": "67900", "HIGHESTPRICE": "68100", "LOWESTPRICE": "67800", "CLOSEPRICE": "68000",
+         "PRESETTLEMENTPRICE": "67950", "SETTLEMENTPRICE": "68020", "VOLUME": "12345", "TURNOVER": "419876.54", "OPENINTEREST": "54321"},
+        {"PRODUCTGROUPID": "au  ", "DELIVERYMONTH": "2312", "OPENPRICE": "455.1", "HIGHESTPRICE": "456.2", "LOWESTPRICE": "454.08", "CLOSEPRICE": "455.66",
+         "PRESETTLEMENTPRICE": "455.02", "SETTLEMENTPRICE": "455.84", "VOLUME": "678", "TURNOVER": "30912.3", "OPENINTEREST": "910"},
+    ]},
+}
+
+
+class Response:
+
+    def __init__(self, data: dict):
+        self.content = json.dumps(data).encode("utf-8")
+
+
+class Session:
+
+    def get(self, url: str, **kwargs) -> Response:
+        return Response(next(data for key, data in RESPONSES.items() if key in url))
+
+
+if __name__ == "__main__":
+    date = "20231016"
+    refs = []
+    for fixed in (False, True):
+        eod_cache.clear()
+        futures = Futures(fixed)
+        futures.session = Session()
+        refs.append(futures.get_ref(date))
+    plain, fixed = refs
+    assert plain.equals(fixed) and (plain.dtypes == fixed.dtypes).all(), f"\n{plain}\n{fixed}"
+    print(plain[["InstrumentID", "UpperLimitPrice", "LowerLimitPrice"]].to_string(index=False))
+    print("fixed and default get_ref match")
@@ -5,12 +5,17 @@ Desc: 中金所
 """
 import os
 import re
-import requests
+import sys
 import pandas as pd
+from io import BytesIO
 from pathlib import Path
 from random import randint
 
-config_path = os.path.join(Path(__file__).parents[1], "config")
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.session import get_pool
+
+config_path = os.path.join(parent_path, "config")
 
 
 class CFFEX:
@@ -56,9 +61,12 @@ class Futures:
             "OpenInterest"
         ]
 
+        self.session = get_pool()
+
     def get_tip(self) -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        tip = pd.read_xml(self.tip_url.format(id=rand_id))
+        r = self.session.get(self.tip_url.format(id=rand_id), timeout=10)
+        tip = pd.read_xml(BytesIO(r.content))
         tip = tip[~tip["INSTRUMENTID"].str.contains("-")]
         tip = tip[["INSTRUMENTID", "STARTDELIVDATE", "ENDDELIVDATE"]]
         tip["STARTDELIVDATE"] = tip["STARTDELIVDATE"].map(lambda x: x if pd.isna(x) else str(int(x)))
@@ -67,7 +75,8 @@ class Futures:
 
     def get_ref(self, date: str, mode: str = "ongoing") -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        ref = pd.read_xml(self.ref_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id))
+        r = self.session.get(self.ref_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id), timeout=10)
+        ref = pd.read_xml(BytesIO(r.content))
         config = pd.read_csv(self.config_file, dtype=str).set_index("Product")
         ref["Unit"] = ref["PRODUCT_ID"].map(lambda x: config.loc[x, "Unit"])
         ref["TickSize"] = ref["PRODUCT_ID"].map(lambda x: config.loc[x, "TickSize"])
@@ -95,7 +104,8 @@ class Futures:
 
     def get_eod(self, date: str) -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        eod = pd.read_xml(self.eod_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id))
+        r = self.session.get(self.eod_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id), timeout=10)
+        eod = pd.read_xml(BytesIO(r.content))
         columns = [
             "instrumentid",
             "tradingday",
@@ -156,11 +166,14 @@ class Option:
             "OpenInterest"
         ]
 
+        self.session = get_pool()
+
     def get_js(self) -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        r = requests.get(url=self.js_url1.format(id=rand_id), timeout=10)
+        r = self.session.get(url=self.js_url1.format(id=rand_id), timeout=10)
         date = re.findall("\\d{8}", r.text)[0]
-        js = pd.read_xml(self.js_url2.format(YYYYMM=date[:6], DD=date[6:], id=rand_id))
+        r = self.session.get(self.js_url2.format(YYYYMM=date[:6], DD=date[6:], id=rand_id), timeout=10)
+        js = pd.read_xml(BytesIO(r.content))
         js = js[["OPTION_SERIES_ID", "MARGIN_ADJUSTMENT_FACTOR", "MARGINRISKMANAGEPARAM"]]
         js.columns = self.js_columns
         return js
@@ -179,7 +192,8 @@ class Option:
 
     def get_ref(self, date: str) -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        ref = pd.read_xml(self.ref_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id))
+        r = self.session.get(self.ref_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id), timeout=10)
+        ref = pd.read_xml(BytesIO(r.content))
         config = pd.read_csv(self.config_file, dtype=str).set_index("Product")
         ref["Unit"] = ref["PRODUCT_ID"].map(lambda x: config.loc[x, "Unit"])
         ref["TickSize"] = ref["PRODUCT_ID"].map(lambda x: config.loc[x, "TickSize"])
@@ -207,7 +221,8 @@ class Option:
 
     def get_eod(self, date: str) -> pd.DataFrame:
         rand_id = str(randint(10, 60))
-        eod = pd.read_xml(self.eod_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id))
+        r = self.session.get(self.eod_url.format(YYYYMM=date[:6], DD=date[6:], id=rand_id), timeout=10)
+        eod = pd.read_xml(BytesIO(r.content))
         columns = [
             "instrumentid",
             "tradingday",
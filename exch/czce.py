@@ -3,27 +3,46 @@
 Date: 2023/09/22
 Desc: 郑商所
 """
-import re
 import sys
+import numpy as np
 import pandas as pd
-from decimal import Decimal
+from io import BytesIO
 from pathlib import Path
 
 parent_path = str(Path(__file__).parents[1])
 sys.path.append(parent_path)
-from tools.helper import new_round
+from tools.excel import read_excel
+from tools.fixed import eod_scales, to_decimal, to_fixed, to_scaled
+from tools.normalize import decimal, strip
+from tools.session import get_pool
+
+# leading number of "10吨/手", "0.5元/吨" and the number in "单边持仓1000手"
+UNIT = r"^(\d+)\D"
+TICK_SIZE = r"^(\d+\.?\d+)\D"
+POSITION_LIMIT = r"^\D+(\d+)\D"
+
+
+def underlying(instrument: pd.Series, product: pd.Series) -> pd.Series:
+    """ProductID + 3 digit month, sliced once per ProductID length"""
+    out = pd.Series(index=instrument.index, dtype=instrument.dtype)
+    length = product.str.len()
+    for n in length.unique():
+        mask = length == n
+        out[mask] = instrument[mask].str[:n + 3]
+    return out
 
 
 class CZCE:
 
-    def __init__(self) -> None:
-        self.futures = Futures()
-        self.option = Option()
+    def __init__(self, fixed: bool = False) -> None:
+        self.futures = Futures(fixed)
+        self.option = Option(fixed)
 
 
 class Futures:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ref_url = "http://www.czce.com.cn/cn/DFSStaticFiles/Future/{year}/{date}/FutureDataReferenceData.xml"
         self.eod_url = "http://www.czce.com.cn/cn/DFSStaticFiles/Future/{year}/{date}/FutureDataDaily.xls"
 
@@ -53,40 +72,47 @@ class Futures:
             "OpenInterest"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
-        }
+        self.session = get_pool()
 
     def get_ref(self, date: str) -> pd.DataFrame:
-        ref = pd.read_xml(self.ref_url.format(year=date[:4], date=date))
+        r = self.session.get(self.ref_url.format(year=date[:4], date=date), timeout=10)
+        return self.parse_ref(r.content)
+
+    def parse_ref(self, content: bytes) -> pd.DataFrame:
+        ref = pd.read_xml(BytesIO(content))
         ref = ref[["CtrCd", "PrdCd", "CtrSz", "TckSz", "PxLim", "MnthPosLmt", "FrstTrdDt", "LstTrdDt", "LstDlvryDt"]]
         ref.columns = [
             "InstrumentID", "ProductID", "Unit", "TickSize", "UpperLimit", "PositionLimit", "FirstTradingDay", "LastTradingDay", "LastDeliveryDay"
         ]
-        ref["Unit"] = ref["Unit"].map(lambda x: re.match("(\\d+)(\\D+)", x)[1])
-        ref["TickSize"] = ref["TickSize"].map(lambda x: re.match("(\\d+\\.?\\d+)(\\D+)", x)[1])
-        ref["UpperLimit"] = ref["UpperLimit"].map(lambda x: new_round(Decimal(x[1:-1]) / 100))
-        ref["PositionLimit"] = ref["PositionLimit"].map(lambda x: re.match("(\\D+)(\\d+)(\\D+)", x)[2])
+        ref["Unit"] = ref["Unit"].str.extract(UNIT, expand=False)
+        ref["TickSize"] = ref["TickSize"].str.extract(TICK_SIZE, expand=False)
+        # "±5%" -> Decimal("0.05"), rounding the percent to 0 digits == rounding the ratio to 2
+        ref["UpperLimit"] = to_decimal(to_scaled(ref["UpperLimit"].str[1:-1].astype(float), 0), 2)
+        ref["PositionLimit"] = ref["PositionLimit"].str.extract(POSITION_LIMIT, expand=False)
         for column in ["FirstTradingDay", "LastTradingDay", "LastDeliveryDay"]:
-            ref[column] = ref[column].map(lambda x: x.replace("-", ""))
+            ref[column] = strip(ref[column], "-")
         return ref
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        eod = pd.read_excel(self.eod_url.format(year=date[:4], date=date), skiprows=1)
+        r = self.session.get(self.eod_url.format(year=date[:4], date=date), timeout=10)
+        eod = read_excel(r.content, skiprows=1)
         eod["TradingDay"] = date
         columns = ["合约代码", "TradingDay", "今开盘", "最高价", "最低价", "今收盘", "昨结算", "今结算", "成交量(手)", "成交额(万元)", "持仓量"]
         eod = eod[columns]
         eod.columns = self.eod_columns
         for column in eod.columns:
-            eod[column] = eod[column].map(lambda x: x.replace(",", "") if not pd.isna(x) else x)
+            eod[column] = strip(eod[column])
         eod = eod[~eod["SettlePrice"].isna()]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ref_url = "http://www.czce.com.cn/cn/DFSStaticFiles/Option/{year}/{date}/OptionDataReferenceData.xml"
         self.eod_url = "http://www.czce.com.cn/cn/DFSStaticFiles/Option/{year}/{date}/OptionDataDaily.xls"
 
@@ -120,14 +146,12 @@ class Option:
             "OpenInterest"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     # TODO: Margin
-    def calc_margin(self, row):
+    def calc_margin(self, ref: pd.DataFrame) -> pd.Series:
         """
-            Margin
+            Margin, computed on the whole ref frame
             期货期权卖方交易保证金的收取标准为下列两者中较大者：
             （一）期权合约结算价×标的期货合约交易单位＋标的期货合约交易保证金－期权合约虚值额的一半
             （二）期权合约结算价×标的期货合约交易单位＋标的期货合约交易保证金的一半
@@ -135,38 +159,45 @@ class Option:
             看涨期权合约虚值额=Max（行权价格－标的期货合约结算价，0）×标的期货合约交易单位
             看跌期权合约虚值额=Max（标的期货合约结算价－行权价格，0）×标的期货合约交易单位
         """
-        return None
+        return pd.Series(None, index=ref.index, dtype=object)
 
     def get_ref(self, date: str) -> pd.DataFrame:
-        ref = pd.read_xml(self.ref_url.format(year=date[:4], date=date))
+        r = self.session.get(self.ref_url.format(year=date[:4], date=date), timeout=10)
+        return self.parse_ref(r.content)
+
+    def parse_ref(self, content: bytes) -> pd.DataFrame:
+        ref = pd.read_xml(BytesIO(content))
         ref = ref[[
             "CtrCd", "PrdCd", "CtrSz", "TckSz", "MnthPosLmt", "FrstTrdDt", "LstTrdDt", "SettleDt", "CallPutTp", "StrikePx", "ExerStyleTp", "SettleTp"
         ]]
         ref.columns = self.ref_columns[:-2]
         ref.drop(index=ref[ref["InstrumentID"] == ref["ProductID"]].index, inplace=True)
-        ref["Unit"] = ref["Unit"].map(lambda x: re.match("(\\d+)(\\D+)", x)[1])
-        ref["TickSize"] = ref["TickSize"].map(lambda x: re.match("(\\d+\\.?\\d+)(\\D+)", x)[1])
-        ref["PositionLimit"] = ref["PositionLimit"].map(lambda x: re.match("(\\D+)(\\d+)(\\D+)", x)[2])
-        ref["CallPut"] = ref["CallPut"].map(lambda x: "C" if x.strip() == "看涨" else "P")
-        ref["StrikePrice"] = ref["StrikePrice"].map(lambda x: x.replace(",", ""))
-        ref["ExecType"] = ref["ExecType"].map(lambda x: "American" if x.strip() == "美式" else "European")
-        ref["DeliveryMethod"] = ref["ExecType"].map(lambda x: "Physical" if x.strip() == "实物" else "Cash")
-        ref["Underlying"] = ref.apply(lambda x: x["InstrumentID"][:len(x["ProductID"]) + 3], axis=1)
-        ref["Margin"] = ref.apply(self.calc_margin, axis=1)
+        ref["Unit"] = ref["Unit"].str.extract(UNIT, expand=False)
+        ref["TickSize"] = ref["TickSize"].str.extract(TICK_SIZE, expand=False)
+        ref["PositionLimit"] = ref["PositionLimit"].str.extract(POSITION_LIMIT, expand=False)
+        ref["CallPut"] = np.where(ref["CallPut"].str.strip() == "看涨", "C", "P")
+        ref["StrikePrice"] = strip(ref["StrikePrice"])
+        ref["ExecType"] = np.where(ref["ExecType"].str.strip() == "美式", "American", "European")
+        ref["DeliveryMethod"] = np.where(ref["ExecType"].str.strip() == "实物", "Physical", "Cash")
+        ref["Underlying"] = underlying(ref["InstrumentID"], ref["ProductID"])
+        ref["Margin"] = self.calc_margin(ref)
         for column in ["FirstTradingDay", "LastTradingDay", "LastDeliveryDay"]:
-            ref[column] = ref[column].map(lambda x: x.replace("-", ""))
+            ref[column] = strip(ref[column], "-")
         return ref
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        eod = pd.read_excel(self.eod_url.format(year=date[:4], date=date), skiprows=1)
+        r = self.session.get(self.eod_url.format(year=date[:4], date=date), timeout=10)
+        eod = read_excel(r.content, skiprows=1)
         eod["TradingDay"] = date
         columns = ["合约代码", "TradingDay", "今开盘", "最高价", "最低价", "今收盘", "昨结算", "今结算", "成交量(手)", "成交额(万元)", "持仓量"]
         eod = eod[columns]
         eod.columns = self.eod_columns
         for column in eod.columns:
-            eod[column] = eod[column].map(lambda x: x.replace(",", "") if not pd.isna(x) else x)
+            eod[column] = strip(eod[column])
         eod = eod[~eod["SettlePrice"].isna()]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
@@ -3,21 +3,28 @@
 Date: 2023/09/22
 Desc: 大商所
 """
-import requests
+import sys
 import pandas as pd
-from decimal import Decimal
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.fixed import eod_scales, to_fixed
+from tools.normalize import decimal
+from tools.session import get_pool
 
 
 class DCE:
 
-    def __init__(self) -> None:
-        self.futures = Futures()
-        self.option = Option()
+    def __init__(self, fixed: bool = False) -> None:
+        self.futures = Futures(fixed)
+        self.option = Option(fixed)
 
 
 class Futures:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ci_url = "http://www.dce.com.cn/publicweb/businessguidelines/queryContractInfo.html"
         self.tp_url = "http://www.dce.com.cn/publicweb/notificationtips/queryDayTradPara.html"
         self.eod_url = "http://www.dce.com.cn/publicweb/quotesdata/dayQuotesCh.html"
@@ -50,15 +57,13 @@ class Futures:
             "OpenInterest"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     def get_contract_info(self) -> pd.DataFrame:
         para = {
             "contractInformation.trade_type": "0"
         }
-        r = requests.post(url=self.ci_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.ci_url, data=para, timeout=10)
         ci = pd.read_html(r.text)[0]
         ci.columns = self.ci_columns
         ci["ProductID"] = ci["InstrumentID"].map(lambda x: x[:-4])
@@ -68,7 +73,7 @@ class Futures:
         para = {
             "dayTradingParameters.trade_type": "0"
         }
-        r = requests.post(url=self.tp_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.tp_url, data=para, timeout=10)
         tp = pd.read_html(r.text)[0]
         tp.columns = ['_'.join(col) for col in tp.columns.values]
         tp = tp[["合约_合约", "涨跌停板_涨停板价位(元)", "涨跌停板_跌停板价位(元)", "持仓限额(手)_客 户"]]
@@ -90,7 +95,7 @@ class Futures:
             "day": date[6:],
             "currDate": date
         }
-        r = requests.post(url=self.eod_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.eod_url, data=para, timeout=10)
         eod = pd.read_html(r.text)[0]
         columns = [
             "ProductID",
@@ -113,13 +118,16 @@ class Futures:
         eod["ProductID"] = eod["InstrumentID"].map(lambda x: x[:-4])
         eod["TradingDay"] = date
         eod = eod[self.eod_columns]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ci_url = "http://www.dce.com.cn/publicweb/businessguidelines/queryContractInfo.html"
         self.tp_url = "http://www.dce.com.cn/publicweb/notificationtips/queryDayTradPara.html"
         self.eod_url = "http://www.dce.com.cn/publicweb/quotesdata/dayQuotesCh.html"
@@ -158,9 +166,7 @@ class Option:
             "OpenInterest"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     # TODO: Margin
     def calc_margin(self, row):
@@ -179,7 +185,7 @@ class Option:
         para = {
             "contractInformation.trade_type": "1"
         }
-        r = requests.post(url=self.ci_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.ci_url, data=para, timeout=10)
         ci = pd.read_html(r.text)[0]
         ci.columns = self.ci_columns
         ci["ProductID"] = ci["InstrumentID"].map(lambda x: x.split("-")[0][:-4])
@@ -190,7 +196,7 @@ class Option:
         para = {
             "dayTradingParameters.trade_type": "1"
         }
-        r = requests.post(url=self.tp_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.tp_url, data=para, timeout=10)
         tp = pd.read_html(r.text)[0]
         tp.columns = ['_'.join(col) for col in tp.columns.values]
         tp = tp[["合约_合约", "涨跌停板_涨停板价位(元)", "涨跌停板_跌停板价位(元)", "持仓限额(手)_客 户"]]
@@ -219,7 +225,7 @@ class Option:
             "day": date[6:],
             "currDate": date
         }
-        r = requests.post(url=self.eod_url, data=para, headers=self.headers, timeout=10)
+        r = self.session.post(url=self.eod_url, data=para, timeout=10)
         eod = pd.read_html(r.text)[0]
         columns = [
             "ProductID",
@@ -246,7 +252,9 @@ class Option:
         eod = eod[self.eod_columns]
         for volumn in ["OpenPrice", "HighPrice", "LowPrice"]:
             eod[volumn] = eod[volumn].map(lambda x: "0.0" if x == "-" else x)
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
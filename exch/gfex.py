@@ -3,21 +3,29 @@
 Date: 2023/09/22
 Desc: 广期所
 """
-import requests
+import sys
 import pandas as pd
-from decimal import Decimal
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.decode import loads
+from tools.fixed import eod_scales, to_fixed
+from tools.normalize import decimal
+from tools.session import get_pool
 
 
 class GFEX:
 
-    def __init__(self) -> None:
-        self.futures = Futures()
-        self.option = Option()
+    def __init__(self, fixed: bool = False) -> None:
+        self.futures = Futures(fixed)
+        self.option = Option(fixed)
 
 
 class Futures:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ci_url = "http://www.gfex.com.cn/u/interfacesWebTtQueryContractInfo/loadList"
         self.tp_url = "http://www.gfex.com.cn/u/interfacesWebTtQueryTradPara/loadDayList"
         self.eod_url = "http://www.gfex.com.cn/u/interfacesWebTiDayQuotes/loadList"
@@ -49,18 +57,16 @@ class Futures:
             "Turnover",
             "OpenInterest"
         ]
+        self.eod_fields = ["open", "high", "low", "close", "lastClear", "clearPrice", "volumn", "turnover", "openInterest"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     def get_contract_info(self) -> pd.DataFrame:
         para = {
             "trade_type": ["0"]
         }
-        r = requests.post(url=self.ci_url, headers=self.headers, data=para, timeout=10)
-        ci = pd.DataFrame(r.json()["data"])
-        ci = ci[["contractId", "varietyOrder", "unit", "tick", "startTradeDate", "endTradeDate", "endDeliveryDate0"]]
+        r = self.session.post(url=self.ci_url, data=para, timeout=10)
+        ci = pd.DataFrame(loads(r.content)["data"], columns=["contractId", "varietyOrder", "unit", "tick", "startTradeDate", "endTradeDate", "endDeliveryDate0"])
         ci.columns = self.ci_columns
         return ci
 
@@ -68,8 +74,8 @@ class Futures:
         para = {
             "trade_type": ["0"]
         }
-        r = requests.post(url=self.tp_url, headers=self.headers, data=para, timeout=10)
-        tp = pd.DataFrame(r.json()["data"])
+        r = self.session.post(url=self.tp_url, data=para, timeout=10)
+        tp = pd.DataFrame(loads(r.content)["data"], columns=["contractId", "tradeType", "riseLimit", "fallLimit", "clientBuySerLimit"])
         tp = tp[tp["tradeType"] == "0"]
         tp = tp[["contractId", "riseLimit", "fallLimit", "clientBuySerLimit"]]
         tp.columns = self.tp_columns
@@ -87,20 +93,23 @@ class Futures:
             "trade_date": [date],
             "trade_type": ["0"]
         }
-        r = requests.post(url=self.eod_url, headers=self.headers, data=para, timeout=10)
-        eod = pd.DataFrame(r.json()["data"])
+        r = self.session.post(url=self.eod_url, data=para, timeout=10)
+        eod = pd.DataFrame(loads(r.content)["data"], columns=["varietyOrder", "delivMonth", *self.eod_fields])
         eod["InstrumentID"] = eod.apply(lambda x: x["varietyOrder"].strip() + x["delivMonth"], axis=1)
         eod["TradingDay"] = date
         eod = eod[["InstrumentID", "TradingDay", "open", "high", "low", "close", "lastClear", "clearPrice", "volumn", "turnover", "openInterest"]]
         eod.columns = self.eod_columns
         eod = eod[~eod["SettlePrice"].isna()]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ci_url = "http://www.gfex.com.cn/u/interfacesWebTtQueryContractInfo/loadList"
         self.tp_url = "http://www.gfex.com.cn/u/interfacesWebTtQueryTradPara/loadDayList"
         self.eod_url = "http://www.gfex.com.cn/u/interfacesWebTiDayQuotes/loadList"
@@ -137,10 +146,9 @@ class Option:
             "Turnover",
             "OpenInterest"
         ]
+        self.eod_fields = ["open", "high", "low", "close", "lastClear", "clearPrice", "volumn", "turnover", "openInterest"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     # TODO: Margin
     def calc_margin(self, row):
@@ -159,9 +167,8 @@ class Option:
         para = {
             "trade_type": ["1"]
         }
-        r = requests.post(url=self.ci_url, headers=self.headers, data=para, timeout=10)
-        ci = pd.DataFrame(r.json()["data"])
-        ci = ci[["contractId", "varietyOrder", "unit", "tick", "startTradeDate", "endTradeDate"]]
+        r = self.session.post(url=self.ci_url, data=para, timeout=10)
+        ci = pd.DataFrame(loads(r.content)["data"], columns=["contractId", "varietyOrder", "unit", "tick", "startTradeDate", "endTradeDate"])
         ci.columns = self.ci_columns
         return ci
 
@@ -169,8 +176,8 @@ class Option:
         para = {
             "trade_type": ["1"]
         }
-        r = requests.post(url=self.tp_url, headers=self.headers, data=para, timeout=10)
-        tp = pd.DataFrame(r.json()["data"])
+        r = self.session.post(url=self.tp_url, data=para, timeout=10)
+        tp = pd.DataFrame(loads(r.content)["data"], columns=["contractId", "tradeType", "riseLimit", "fallLimit", "clientBuySerLimit"])
         tp = tp[tp["tradeType"] == "1"]
         tp = tp[["contractId", "riseLimit", "fallLimit", "clientBuySerLimit"]]
         tp.columns = self.tp_columns
@@ -194,13 +201,15 @@ class Option:
             "trade_date": [date],
             "trade_type": ["1"]
         }
-        r = requests.post(url=self.eod_url, headers=self.headers, data=para, timeout=10)
-        eod = pd.DataFrame(r.json()["data"])
+        r = self.session.post(url=self.eod_url, data=para, timeout=10)
+        eod = pd.DataFrame(loads(r.content)["data"], columns=["delivMonth", *self.eod_fields])
         eod["TradingDay"] = date
         eod = eod[["delivMonth", "TradingDay", "open", "high", "low", "close", "lastClear", "clearPrice", "volumn", "turnover", "openInterest"]]
         eod.columns = self.eod_columns
         eod = eod[~eod["SettlePrice"].isna()]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
@@ -3,25 +3,76 @@
 Date: 2023/09/22
 Desc: 港交所
 """
+import sys
 import requests
+import numpy as np
 import pandas as pd
-from decimal import Decimal
-from collections import defaultdict
+from io import StringIO
+from pathlib import Path
+from datetime import datetime
+from collections import deque
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.cache import conditional_frame, load_json, save_json
+from tools.excel import read_excel
+from tools.fixed import eod_scales, to_fixed
+from tools.normalize import as_decimal
+from tools.parallel import run_parallel
+from tools.session import get_pool, iter_lines
+from tools.sink import get_sink
 
 pd.set_option('display.unicode.east_asian_width', True)
 
+# d{YYMMDD}c.htm layout
+OPEN_SEP = "-" * 79
+QUOTE_SEP = "-" * 105
+PAGE_BREAK = "</font></pre><pre><font size='1'>"
+QUOTE_COLUMNS = ["PreClosePrice", "BidPrice", "AskPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
+
+
+def to_number(value: str):
+    """quote field -> int / float, N/A and - are 0"""
+    value = value.replace(",", "")
+    if value in ("N/A", "-"):
+        return 0
+    return int(value) if value.isdigit() else float(value)
+
+
+def merge_sessions(eod: pd.DataFrame):
+    """
+        after-hours (AHT) + day (DT) session: AHT open unless it is 0, higher high,
+        lower low (AHT kept on ties, like max / min), summed volume
+    """
+    def column(name):
+        return eod[name].to_numpy(dtype=object)
+
+    def decimals(name):
+        return as_decimal(column(name))
+
+    def assign(name, values):
+        eod[name] = pd.Series(values, index=eod.index).infer_objects()
+
+    aht, dt = decimals("AHTHighPrice"), decimals("DTHighPrice")
+    assign("OpenPrice", np.where(decimals("AHTOpenPrice") == 0, column("DTOpenPrice"), column("AHTOpenPrice")))
+    assign("HighPrice", np.where(dt > aht, dt, aht))
+    aht, dt = decimals("AHTLowPrice"), decimals("DTLowPrice")
+    assign("LowPrice", np.where(dt < aht, dt, aht))
+    assign("Volume", decimals("AHTVolume") + decimals("DTVolume"))
+
 
 class HKG:
 
-    def __init__(self) -> None:
-        self.stock = Stock()
-        self.futures = Futures()
-        self.option = Option()
+    def __init__(self, fixed: bool = False) -> None:
+        self.stock = Stock(fixed)
+        self.futures = Futures(fixed)
+        self.option = Option(fixed)
 
 
 class Stock:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ref_url = "https://sc.hkex.com.hk/TuniS/www.hkex.com.hk/chi/services/trading/securities/securitieslists/ListOfSecurities_c.xlsx"
         self.eod_url = "https://sc.hkex.com.hk/gb/www.hkex.com.hk/chi/stat/smstat/dayquot/d{YYMMDD}c.htm"
 
@@ -40,86 +91,87 @@ class Stock:
             "Turnover"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
+        self.sink = get_sink()
 
     def get_ref(self) -> pd.DataFrame:
-        r = requests.get(self.ref_url, headers=self.headers, timeout=10)
-        ref = pd.read_excel(r.content, skiprows=2)
-        return ref
+        return conditional_frame(self.session, self.ref_url, lambda content: read_excel(content, skiprows=2), timeout=10)
 
     def get_open(self, resp: requests.Response) -> pd.DataFrame:
-        lines = resp.text.split("\r\n")
-        sep = "-------------------------------------------------------------------------------"
-        sep_index = [index for (index, value) in enumerate(lines) if value == sep]
-        raw = [line.replace("</font></pre><pre><font size='1'>", "") for line in lines[sep_index[1] + 4:sep_index[2] - 1]]
-        raw_records = defaultdict(str)
-        for line in raw:
+        return self.parse_quotation(iter_lines(resp, "gbk"))[1]
+
+    def parse_quotation(self, lines) -> tuple:
+        """
+            One pass over the d{YYMMDD}c.htm lines, returns (quote columns, opening prices).
+            Opening trades sit between the 2nd and 3rd short separator,
+            quotes between the 3rd and 2nd last long separator.
+        """
+        opening, open_seps = [], 0
+        blocks = deque(maxlen=3)
+        for line in lines:
+            if line == OPEN_SEP:
+                open_seps += 1
+            elif open_seps == 2:
+                opening.append(line)
+            if line == QUOTE_SEP:
+                blocks.append([])
+            elif blocks:
+                blocks[-1].append(line)
+        if open_seps < 3 or len(blocks) < 3:
+            # 404 / holiday pages have no report, the old index lookups raised here too
+            raise ValueError(f"not a quotation page, {open_seps} opening and {len(blocks)} quote separators")
+
+        trans = {}
+        for line in opening[3:-1]:
+            line = line.replace(PAGE_BREAK, "")
             if "<" in line and not line.startswith("      "):
-                instrumentid = line.split()[0].zfill(5)
-                raw_records[instrumentid] += line.lstrip()
-
-        records = []
-        for instrumentid, trans in raw_records.items():
-            op = "0.0"
-            record = []
-            trans = trans.replace(",", "")
-            for i in trans.split():
-                if "-" in i and i.split("-")[1].replace(".", "").isdigit():
-                    record.append(i)
-            for pv in record:
-                if pv[0] in ["P", "D", "Y"]:
-                    continue
-                op = pv.split("-")[1]
-                break
-            records.append([instrumentid, op])
-        ops = pd.DataFrame(records, columns=["InstrumentID", "OpenPrice"]).set_index("InstrumentID")
-        return ops
-
-    # missing open price
-    def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(self.eod_url.format(YYMMDD=date[2:]), headers=self.headers, timeout=30)
-        r.encoding = "gbk"
-        ops = self.get_open(r)
-        lines = r.text.split("\r\n")
-        sep = "---------------------------------------------------------------------------------------------------------"
-        sep_index = [index for (index, value) in enumerate(lines) if value == sep]
-        raw = [line.lstrip("*").replace("</font></pre><pre><font size='1'>", "") for line in lines[sep_index[-3] + 7:sep_index[-2]]]
-        records = []
-        for line in raw:
-            instrumentid = line.split()[0].strip().split("#")[0].zfill(5)
-            tmp = line.split()
+                trans.setdefault(line.split()[0].zfill(5), []).append(line.lstrip())
+        ops = {}
+        for instrumentid, parts in trans.items():
+            op = 0.0
+            for pv in "".join(parts).replace(",", "").split():
+                if "-" in pv and pv.split("-")[1].replace(".", "").isdigit() and pv[0] not in "PDY":
+                    op = float(pv.split("-")[1])
+                    break
+            ops[instrumentid] = op
+        ops = pd.DataFrame({"OpenPrice": pd.Series(ops, dtype=float)}).rename_axis("InstrumentID")
+
+        instrumentids, currencies = [], []
+        values = [[] for _ in QUOTE_COLUMNS]
+        for line in blocks[0][6:]:
+            tmp = line.lstrip("*").replace(PAGE_BREAK, "").split()
+            instrumentids.append(tmp[0].split("#")[0].zfill(5))
             if "TRADING SUSPENDED" in line or "TRADING HALTED" in line:
-                record = [instrumentid, date, tmp[-4], "0.0", "0.0", "0.0", "0.0", "0.0", "0.0", "0.0", "0.0"]
+                currencies.append(tmp[-4])
+                fields = ["0"] * len(QUOTE_COLUMNS)
             else:
-                record = [instrumentid, date] + tmp[-9:]
-            records.append(record)
-        columns = [
-            "InstrumentID",
-            "TradingDay",
-            "Currency",
-            "PreClosePrice",
-            "BidPrice",
-            "AskPrice",
-            "HighPrice",
-            "LowPrice",
-            "ClosePrice",
-            "Volume",
-            "Turnover"
-        ]
-        eod = pd.DataFrame(records, columns=columns)
-        for column in eod.columns[3:]:
-            eod[column] = eod[column].map(lambda x: x.strip().replace("N/A", "0.0").replace("-", "0.0").replace(",", ""))
-        eod["OpenPrice"] = eod["InstrumentID"].map(lambda x: ops.loc[x, "OpenPrice"] if x in ops.index else "0.0")
+                currencies.append(tmp[-9])
+                fields = tmp[-8:]
+            for column, value in zip(values, fields):
+                column.append(to_number(value))
+        quotes = {"InstrumentID": instrumentids, "Currency": currencies}
+        for column, value in zip(QUOTE_COLUMNS, values):
+            quotes[column] = np.array(value, dtype=np.float64 if column.endswith("Price") else None)
+        return quotes, ops
+
+    def get_eod(self, date: str) -> pd.DataFrame:
+        with self.session.get(self.eod_url.format(YYMMDD=date[2:]), timeout=30, stream=True) as r:
+            r.raise_for_status()
+            quotes, ops = self.parse_quotation(iter_lines(r, "gbk"))
+        eod = pd.DataFrame(quotes)
+        eod["TradingDay"] = date
+        eod["OpenPrice"] = eod["InstrumentID"].map(ops["OpenPrice"]).fillna(0.0)
         eod = eod[self.eod_columns]
-        eod.to_csv(f"/tmp/stock_{date}.csv", index=False)
+        self.sink.write(eod, f"stock_{date}")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns))
         return eod
 
 
 class Futures:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.product_url = "https://sc.hkex.com.hk/gb/www.hkex.com.hk/chi/market/rm/rm_dcrm/riskdata/margin_hkcc/mertc_hkcc_{YYMMDD}.htm"
         self.eod_url = "https://sc.hkex.com.hk/TuniS/www.hkex.com.hk/eng/stat/dmstat/dayrpt/{product}{YYMMDD}.htm"
 
@@ -137,9 +189,13 @@ class Futures:
             "OpenInterest"
         ]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
+        self.sink = get_sink()
+
+        # product universe, reused while the cached copy is within products_max_age days of the requested date
+        self.products_cache = "hkg_futures_products"
+        self.products_max_age = 7
+        self._products = None
 
         self.month_mapper = {
             "JAN": "01",
@@ -253,9 +309,36 @@ class Futures:
             }
         }
 
-    def get_products(self, date: str) -> dict:
+    def get_products(self, date: str, refresh: bool = False) -> dict:
+        """
+            product -> page name, from memory / disk while fresh, else from the margin page.
+            A failed fetch falls back to the cached copy however old it is.
+        """
+        cached = self._products or load_json(self.products_cache)
+        if cached and not refresh:
+            age = abs((datetime.strptime(date, "%Y%m%d") - datetime.strptime(cached["date"], "%Y%m%d")).days)
+            if age <= self.products_max_age:
+                self._products = cached
+                return dict(cached["products"])
+        try:
+            products = self.fetch_products(date)
+        except Exception:
+            if not cached:
+                raise
+            self._products = cached
+            return dict(cached["products"])
+        self.seed_products(products, date)
+        return products
+
+    def seed_products(self, products: dict, date: str):
+        """store a product map as fetched on date, also for seeding the cache offline"""
+        self._products = {"date": date, "products": dict(products)}
+        save_json(self.products_cache, self._products)
+
+    def fetch_products(self, date: str) -> dict:
         products = {}
-        df = pd.read_html(self.product_url.format(YYMMDD=date[2:]))[-1]
+        r = self.session.get(self.product_url.format(YYMMDD=date[2:]), timeout=10)
+        df = pd.read_html(StringIO(r.text))[-1]
         for row in df.values:
             products.update({
                 i: i + "f" for i in row if not pd.isna(i)
@@ -277,7 +360,7 @@ class Futures:
         retry = 0
         while retry < 5:
             try:
-                r = requests.get(self.eod_url.format(product=para, YYMMDD=date[2:]), headers=self.headers, timeout=10)
+                r = self.session.get(self.eod_url.format(product=para, YYMMDD=date[2:]), timeout=10)
                 break
             except Exception as e:
                 print(e)
@@ -305,39 +388,41 @@ class Futures:
                 if "-" in i and "/" not in i and i.split("-")[0] in self.month_mapper and "EXPIRED" not in "".join(i.split())
             ]
             eod = pd.DataFrame(lines, columns=self.product_mapper[product]["columns"] if product in self.product_mapper else self.columns[2])
+        if eod.empty:
+            return pd.DataFrame()
         for column in eod.columns[2:]:
-            eod[column] = eod[column].map(lambda x: 0 if x.strip() == "-" else Decimal(x))
+            values = eod[column].to_numpy(dtype=object)
+            dash = values == "-"
+            values[~dash] = as_decimal(values[~dash])
+            values[dash] = 0
+            eod[column] = pd.Series(values, index=eod.index).infer_objects()
         if "AHTOpenPrice" in eod.columns:
-            eod["OpenPrice"] = eod.apply(lambda x: x["DTOpenPrice"] if Decimal(x["AHTOpenPrice"]) == 0 else x["AHTOpenPrice"], axis=1)
-            eod["HighPrice"] = eod.apply(lambda x: max(Decimal(x["AHTHighPrice"]), Decimal(x["DTHighPrice"])), axis=1)
-            eod["LowPrice"] = eod.apply(lambda x: min(Decimal(x["AHTLowPrice"]), Decimal(x["DTLowPrice"])), axis=1)
-            eod["Volume"] = eod.apply(lambda x: Decimal(x["AHTVolume"]) + Decimal(x["DTVolume"]), axis=1)
+            merge_sessions(eod)
         eod["ClosePrice"] = eod["SettlePrice"]
         eod["TradingDay"] = date
-        eod["InstrumentID"] = eod.apply(
-            lambda x: x["Product"] + x["ContractMonth"].split("-")[1] + self.month_mapper[x["ContractMonth"].split("-")[0]], axis=1
-        )
+        contractmonth = eod["ContractMonth"].str.split("-")
+        eod["InstrumentID"] = eod["Product"] + contractmonth.str[1] + contractmonth.str[0].map(self.month_mapper)
         eod = eod[["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "SettlePrice", "Volume", "OpenInterest"]]
         return eod
 
-    def get_eod(self, date: str) -> pd.DataFrame:
+    def get_eod(self, date: str, max_workers: int = 8) -> pd.DataFrame:
         products = self.get_products(date)
-        eod = pd.DataFrame()
-        for product, para in products.items():
-            df = self.get_eod_by_product(date, product, para)
-            eod = pd.concat([eod, df])
-        eod.to_csv(f"/tmp/futures_{date}.csv", index=False)
+        dfs = run_parallel(lambda item: self.get_eod_by_product(date, *item), products.items(), max_workers)
+        eod = pd.concat(dfs) if dfs else pd.DataFrame()
+        self.sink.write(eod, f"futures_{date}")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns))
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.eod_url = "https://sc.hkex.com.hk/TuniS/www.hkex.com.hk/eng/stat/dmstat/dayrpt/{product}{YYMMDD}.htm"
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
+        self.sink = get_sink()
 
         self.month_mapper = {
             "JAN": "01",
@@ -411,29 +496,26 @@ class Option:
             "dqe": "dqe"
         }
 
-    def gen_instrumentid(self, row: pd.Series) -> str:
-        product = row["Product"]
-        contractmonth = str(row["ContractMonth"])
-        callput = row["CallPut"]
-        strikeprice = row["StrikePrice"]
-        if "-" in contractmonth:
-            cm = contractmonth.split("-")
-            if len(cm) == 2:
-                maturity = cm[1] + self.month_mapper[cm[0]]
-            elif len(cm) == 3:
-                maturity = cm[2] + self.month_mapper[cm[1]] + "W" + cm[0]
-            else:
-                raise Exception("Error ContractMonth " + contractmonth)
-        else:
-            maturity = contractmonth[-2:] + self.month_mapper[contractmonth[:3]]
-        return product + maturity + callput + strikeprice
+    def gen_instrumentid(self, eod: pd.DataFrame) -> pd.Series:
+        """
+            MMM-YY -> YYMM, W-MMM-YY (weekly) -> YYMMWn, MMMYY -> YYMM,
+            then Product + maturity + CallPut + StrikePrice
+        """
+        contractmonth = eod["ContractMonth"].astype(str)
+        cm = contractmonth.str.split("-")
+        n = cm.str.len()
+        if (n > 3).any():
+            raise Exception("Error ContractMonth " + contractmonth[n > 3].iloc[0])
+        maturity = cm.str[-1] + cm.str[-2].map(self.month_mapper) + ("W" + cm.str[0]).where(n == 3, "")
+        maturity = maturity.where(n > 1, contractmonth.str[-2:] + contractmonth.str[:3].map(self.month_mapper))
+        return eod["Product"] + maturity + eod["CallPut"] + eod["StrikePrice"]
 
     def get_eod_by_product(self, date: str, product: str, para: str) -> pd.DataFrame:
         eod = pd.DataFrame()
         retry = 0
         while retry < 5:
             try:
-                r = requests.get(self.eod_url.format(product=para, YYMMDD=date[2:]), headers=self.headers, timeout=10)
+                r = self.session.get(self.eod_url.format(product=para, YYMMDD=date[2:]), timeout=10)
                 break
             except:
                 retry += 1
@@ -466,33 +548,36 @@ class Option:
                 (i.split("-")[0] in self.month_mapper or i.split("-")[1] in self.month_mapper) and len(i.split()) == 20
             ]
             eod = pd.DataFrame(lines, columns=self.columns[1])
+        if eod.empty:
+            return pd.DataFrame()
         for column in eod.columns[2:]:
-            eod[column] = eod[column].map(lambda x: 0 if x.strip() == "-" else x)
+            values = eod[column].to_numpy(dtype=object)
+            values[values == "-"] = 0
+            eod[column] = pd.Series(values, index=eod.index).infer_objects()
         if "AHTOpenPrice" in eod.columns:
-            eod["OpenPrice"] = eod.apply(lambda x: x["DTOpenPrice"] if Decimal(x["AHTOpenPrice"]) == 0 else x["AHTOpenPrice"], axis=1)
-            eod["HighPrice"] = eod.apply(lambda x: max(Decimal(x["AHTHighPrice"]), Decimal(x["DTHighPrice"])), axis=1)
-            eod["LowPrice"] = eod.apply(lambda x: min(Decimal(x["AHTLowPrice"]), Decimal(x["DTLowPrice"])), axis=1)
-            eod["Volume"] = eod.apply(lambda x: Decimal(x["AHTVolume"]) + Decimal(x["DTVolume"]), axis=1)
+            merge_sessions(eod)
         eod["ClosePrice"] = eod["SettlePrice"]
         eod["TradingDay"] = date
-        eod["InstrumentID"] = eod.apply(self.gen_instrumentid, axis=1)
+        eod["InstrumentID"] = self.gen_instrumentid(eod)
         eod = eod[["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "SettlePrice", "Volume", "OpenInterest"]]
         return eod
 
-    def get_eod(self, date: str) -> pd.DataFrame:
-        eod = pd.DataFrame()
-        for product, para in self.products.items():
-            df = self.get_eod_by_product(date, product, para)
-            eod = pd.concat([eod, df])
-        eod.sort_values(by=["InstrumentID"], inplace=True)
-        eod.to_csv(f"/tmp/option_{date}.csv", index=False)
+    def get_eod(self, date: str, max_workers: int = 8) -> pd.DataFrame:
+        dfs = run_parallel(lambda item: self.get_eod_by_product(date, *item), self.products.items(), max_workers)
+        if not dfs:
+            eod = pd.DataFrame()
+        else:
+            eod = pd.concat(dfs)
+            eod.sort_values(by=["InstrumentID"], inplace=True)
+        self.sink.write(eod, f"option_{date}")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns))
         return eod
 
 
 if __name__ == "__main__":
     hkg = HKG()
     import sys
-    from datetime import datetime
 
     from loguru import logger
     date = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y%m%d")
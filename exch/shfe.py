@@ -5,15 +5,17 @@ Desc: 上期所
 """
 import os
 import sys
-import requests
 import pandas as pd
-from math import floor
 from pathlib import Path
-from decimal import Decimal
 
 parent_path = str(Path(__file__).parents[1])
 sys.path.append(parent_path)
-from tools.helper import new_round
+from tools.cache import cached_frame, eod_cache
+from tools.decode import loads
+from tools.fixed import eod_scales, to_fixed
+from tools.normalize import decimal
+from tools.limit import limit_price
+from tools.session import get_pool
 from tools.tradingday import CN_TradingDay
 
 config_path = os.path.join(parent_path, "config")
@@ -21,14 +23,15 @@ config_path = os.path.join(parent_path, "config")
 
 class SHFE:
 
-    def __init__(self) -> None:
-        self.futures = Futures()
-        self.option = Option()
+    def __init__(self, fixed: bool = False) -> None:
+        self.futures = Futures(fixed)
+        self.option = Option(fixed)
 
 
 class Futures:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.config_file = os.path.join(config_path, "shfe.csv")
         self.ci_url = "https://www.shfe.com.cn/data/instrument/ContractBaseInfo{date}.dat"
         self.tp_url = "https://www.shfe.com.cn/data/instrument/ContractDailyTradeArgument{date}.dat"
@@ -62,48 +65,30 @@ class Futures:
             "Turnover",
             "OpenInterest"
         ]
+        # raw eod fields in eod_columns order, only these are built from the response
+        self.eod_fields = ["OPENPRICE", "HIGHESTPRICE", "LOWESTPRICE", "CLOSEPRICE", "PRESETTLEMENTPRICE", "SETTLEMENTPRICE", "VOLUME", "TURNOVER", "OPENINTEREST"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
         self.tradingday = CN_TradingDay()
 
     def get_contract_info(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.ci_url.format(date=date), headers=self.headers, timeout=10)
-        ci = pd.DataFrame(r.json()["ContractBaseInfo"])
+        r = self.session.get(url=self.ci_url.format(date=date), timeout=10)
+        ci = pd.DataFrame(loads(r.content)["ContractBaseInfo"], columns=["INSTRUMENTID", "BASISPRICE", "OPENDATE", "EXPIREDATE", "STARTDELIVDATE", "ENDDELIVDATE"])
         ci["ProductID"] = ci["INSTRUMENTID"].map(lambda x: x[:-4])
         ci = ci[["INSTRUMENTID", "ProductID", "BASISPRICE", "OPENDATE", "EXPIREDATE", "STARTDELIVDATE", "ENDDELIVDATE"]]
         ci.columns = self.ci_columns
         return ci
 
     def get_trade_para(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.tp_url.format(date=date), headers=self.headers, timeout=10)
-        tp = pd.DataFrame(r.json()["ContractDailyTradeArgument"])
+        r = self.session.get(url=self.tp_url.format(date=date), timeout=10)
+        tp = pd.DataFrame(loads(r.content)["ContractDailyTradeArgument"], columns=["INSTRUMENTID", "UPPER_VALUE", "LOWER_VALUE"])
         tp = tp[["INSTRUMENTID", "UPPER_VALUE", "LOWER_VALUE"]]
         tp["UPPER_VALUE"] = tp["UPPER_VALUE"].astype(float)
         tp["LOWER_VALUE"] = tp["LOWER_VALUE"].astype(float)
         tp.columns = self.tp_columns
         return tp
 
-    @staticmethod
-    def calc_upper(row):
-        pre_settle = Decimal(str(row["PreSettlePrice"]))
-        upper_limit = Decimal(str(row["UpperLimit"]))
-        tick_size = Decimal(str(row["TickSize"]))
-        up = pre_settle * (1 + upper_limit)
-        up = new_round(floor(up / tick_size) * tick_size)
-        return up
-
-    @staticmethod
-    def calc_lower(row):
-        pre_settle = Decimal(str(row["PreSettlePrice"]))
-        lower_limit = Decimal(str(row["LowerLimit"]))
-        tick_size = Decimal(str(row["TickSize"]))
-        low = pre_settle * (1 - lower_limit)
-        low = new_round(floor(low / tick_size) * tick_size)
-        return low
-
     def get_ref(self, date: str) -> pd.DataFrame:
         ci = self.get_contract_info(date)
         tp = self.get_trade_para(date)
@@ -114,18 +99,30 @@ class Futures:
         ref["TickSize"] = ref["ProductID"].map(lambda x: config.loc[x, "TickSize"])
         ref["PositionLimit"] = None
         pre_date = self.tradingday.get_pre(date)
-        pre_eod = self.get_eod(pre_date).set_index("InstrumentID")
-        ref["PreSettlePrice"] = ref.apply(
-            lambda x: pre_eod.loc[x["InstrumentID"], "SettlePrice"] if x["InstrumentID"] in pre_eod.index else x["ListPrice"], axis=1
-        )
-        ref["UpperLimitPrice"] = ref.apply(self.calc_upper, axis=1)
-        ref["LowerLimitPrice"] = ref.apply(self.calc_lower, axis=1)
+        pre_eod = self.get_eod(pre_date, fixed=False).drop_duplicates("InstrumentID").set_index("InstrumentID")
+        settle = pre_eod["SettlePrice"].astype(object)
+        ref["PreSettlePrice"] = ref["InstrumentID"].map(settle).where(ref["InstrumentID"].isin(settle.index), ref["ListPrice"])
+        ref["UpperLimitPrice"] = limit_price(ref["PreSettlePrice"], ref["UpperLimit"], ref["TickSize"], "upper")
+        ref["LowerLimitPrice"] = limit_price(ref["PreSettlePrice"], ref["LowerLimit"], ref["TickSize"], "lower")
         ref = ref[self.ref_columns]
         return ref
 
-    def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date=date), headers=self.headers, timeout=10)
-        eod = pd.DataFrame(r.json()["o_curinstrument"])
+    def get_eod(self, date: str, fixed: bool = None) -> pd.DataFrame:
+        """
+            fixed overrides self.fixed for this call, get_ref always needs the Decimal prices.
+            One parsed frame is cached per date, both modes are converted from it.
+        """
+        fixed = self.fixed if fixed is None else fixed
+        eod = cached_frame(eod_cache, ("shfe", "futures", date), lambda: self.download_eod(date))
+        if fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
+        return eod
+
+    def download_eod(self, date: str) -> pd.DataFrame:
+        """kx file as text columns, before the fixed / Decimal conversion"""
+        r = self.session.get(url=self.eod_url.format(date=date), timeout=10)
+        eod = pd.DataFrame(loads(r.content)["o_curinstrument"], columns=["PRODUCTGROUPID", "DELIVERYMONTH", *self.eod_fields])
         eod["InstrumentID"] = eod.apply(lambda x: x["PRODUCTGROUPID"].strip() + x["DELIVERYMONTH"], axis=1)
         eod["TradingDay"] = date
         eod = eod[[
@@ -143,13 +140,13 @@ class Futures:
         ]]
         eod.columns = self.eod_columns
         eod = eod[eod["SettlePrice"].str.len() != 0]
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.config_file = os.path.join(config_path, "shfe.csv")
         self.ci_url = "https://www.shfe.com.cn/data/instrument/option/ContractBaseInfo{date}.dat"
         self.tp_url = "https://www.shfe.com.cn/data/instrument/option/ContractDailyTradeArgument{date}.dat"
@@ -187,10 +184,9 @@ class Option:
             "Turnover",
             "OpenInterest"
         ]
+        self.eod_fields = ["OPENPRICE", "HIGHESTPRICE", "LOWESTPRICE", "CLOSEPRICE", "PRESETTLEMENTPRICE", "SETTLEMENTPRICE", "VOLUME", "TURNOVER", "OPENINTEREST"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
         self.tradingday = CN_TradingDay()
 
@@ -208,16 +204,16 @@ class Option:
         return None
 
     def get_contract_info(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.ci_url.format(date=date), headers=self.headers, timeout=10)
-        ci = pd.DataFrame(r.json()["OptionContractBaseInfo"])
+        r = self.session.get(url=self.ci_url.format(date=date), timeout=10)
+        ci = pd.DataFrame(loads(r.content)["OptionContractBaseInfo"], columns=["INSTRUMENTID", "COMMODITYID", "TRADEUNIT", "PRICETICK", "OPENDATE", "EXPIREDATE"])
         ci = ci[["INSTRUMENTID", "COMMODITYID", "TRADEUNIT", "PRICETICK", "OPENDATE", "EXPIREDATE"]]
         ci["PRICETICK"] = ci["PRICETICK"].astype(float)
         ci.columns = self.ci_columns
         return ci
 
     def get_trade_para(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.tp_url.format(date=date), headers=self.headers, timeout=10)
-        tp = pd.DataFrame(r.json()["OptionContractDailyTradeArgument"])
+        r = self.session.get(url=self.tp_url.format(date=date), timeout=10)
+        tp = pd.DataFrame(loads(r.content)["OptionContractDailyTradeArgument"], columns=["INSTRUMENTID", "UPPERVALUE", "LOWERVALUE"])
         tp = tp[["INSTRUMENTID", "UPPERVALUE", "LOWERVALUE"]]
         tp["UPPERVALUE"] = tp["UPPERVALUE"].astype(float)
         tp["LOWERVALUE"] = tp["LOWERVALUE"].astype(float)
@@ -239,8 +235,16 @@ class Option:
         return ref
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date=date), headers=self.headers, timeout=10)
-        eod = pd.DataFrame(r.json()["o_curinstrument"])
+        eod = cached_frame(eod_cache, ("shfe", "option", date), lambda: self.download_eod(date))
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
+        return eod
+
+    def download_eod(self, date: str) -> pd.DataFrame:
+        """kx file as text columns, before the fixed / Decimal conversion"""
+        r = self.session.get(url=self.eod_url.format(date=date), timeout=10)
+        eod = pd.DataFrame(loads(r.content)["o_curinstrument"], columns=["INSTRUMENTID", *self.eod_fields])
         eod["TradingDay"] = date
         eod = eod[[
             "INSTRUMENTID",
@@ -260,7 +264,6 @@ class Option:
         eod["InstrumentID"] = eod["InstrumentID"].map(lambda x: x.strip())
         for volumn in ["OpenPrice", "HighPrice", "LowPrice"]:
             eod[volumn] = eod[volumn].map(lambda x: "0.0" if not x else x)
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
         return eod
 
 
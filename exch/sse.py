@@ -3,10 +3,20 @@
 Date: 2023/09/22
 Desc: 上交所
 """
-import json
+import sys
 import time
-import requests
 import pandas as pd
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.cache import conditional_frame
+from tools.collector import Collector
+from tools.decode import jsonp
+from tools.excel import read_excel
+from tools.history import HistoryDownloader, KlineStore, dayk
+from tools.parallel import run_parallel
+from tools.session import get_pool
 
 
 class SSE:
@@ -25,69 +35,68 @@ class Stock:
     def __init__(self):
         self.stock_list_url = "http://query.sse.com.cn//sseQuery/commonExcelDd.do?sqlId=COMMON_SSE_CP_GPJCTPZ_GPLB_GP_L&type=inParams&CSRC_CODE=&STOCK_CODE=&REG_PROVINCE=&STOCK_TYPE={stock_type}&COMPANY_STATUS=2,4,5,7,8"
         self.delist_list_url = "http://query.sse.com.cn//sseQuery/commonExcelDd.do?sqlId=COMMON_SSE_CP_GPJCTPZ_GPLB_ZZGP_L&type=inParams&CSRC_CODE=&STOCK_CODE=&REG_PROVINCE=&STOCK_TYPE={stock_type}&COMPANY_STATUS=3"
-        self.stock_eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/dayk/{stock}?callback=jQuery112409826351965297482_{t}&begin=0&end=-1&period=day&_={t}"
+        self.stock_eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/dayk/{stock}?callback=jQuery112409826351965297482_{t}&begin={begin}&end=-1&period=day&_={t}"
 
         self.eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/list/exchange/equity?callback=jsonpCallback62585600&select=code%2Copen%2Chigh%2Clow%2Clast%2Cvolume%2Camount%2C&order=&begin=0&end=-1&_={t}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
+        # instrument -> exception from the last get_eod_history, missing from its result
+        self.failed = {}
 
     def get_stock_list(self) -> pd.DataFrame:
-        stock_list = pd.DataFrame()
+        stock_list = Collector()
         for stock_type in ["1", "8"]:
-            r = requests.get(url=self.stock_list_url.format(stock_type=stock_type), headers=self.headers, timeout=10)
-            tmp = pd.read_excel(r.content)
-            stock_list = pd.concat([stock_list, tmp])
+            url = self.stock_list_url.format(stock_type=stock_type)
+            stock_list.append(conditional_frame(self.session, url, read_excel, headers=self.headers, timeout=10))
+        stock_list = stock_list.result()
         stock_list.set_index("A股代码", inplace=True)
         return stock_list
 
     def get_delist(self) -> pd.DataFrame:
-        delist = pd.DataFrame()
+        delist = Collector()
         for stock_type in ["1", "8"]:
-            r = requests.get(url=self.delist_list_url.format(stock_type=stock_type), headers=self.headers, timeout=10)
-            tmp = pd.read_excel(r.content)
-            delist = pd.concat([delist, tmp])
+            url = self.delist_list_url.format(stock_type=stock_type)
+            delist.append(conditional_frame(self.session, url, read_excel, headers=self.headers, timeout=10))
+        delist = delist.result()
         delist.set_index("原公司代码", inplace=True)
         return delist
 
-    def get_single_stock_eod(self, stock: str, date: str = "all") -> pd.DataFrame:
-        t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.stock_eod_url.format(t=t, stock=stock), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(", 1)[1][:-1])
-        eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
-        eod["InstrumentID"] = stock
-        eod = eod[self.eod_columns]
-        if date != "all":
-            eod = eod[eod["TradingDay"] == int(date)]
-        return eod
+    def get_single_stock_eod(self, stock: str, date: str = "all", begin: int = None) -> pd.DataFrame:
 
-    def get_eod_history(self) -> pd.DataFrame:
+        def fetch(begin: int) -> pd.DataFrame:
+            t = str(time.time() * 1000).split(".")[0]
+            r = self.session.get(self.stock_eod_url.format(t=t, stock=stock, begin=begin), headers=self.headers, timeout=10)
+            data = jsonp(r.content)
+            eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
+            eod["InstrumentID"] = stock
+            return eod[self.eod_columns]
+
+        return dayk(fetch, date, begin)
+
+    def get_eod_history(self, on_chunk=None, max_workers: int = 8, resume: bool = True, incremental: bool = False) -> pd.DataFrame:
+        """incremental: keep a local KlineStore and only fetch bars since its last day"""
         stock_list = self.get_stock_list()
         delist = self.get_delist()
         _all = list(stock_list.index) + list(delist.index)
-        eod = pd.DataFrame()
-        for stock in _all:
-            retry = 0
-            df = pd.DataFrame()
-            while retry < 3:
-                try:
-                    df = self.get_single_stock_eod(stock)
-                    break
-                except:
-                    retry += 1
-                    continue
-            eod = pd.concat([eod, df])
+        fetch = self.get_single_stock_eod
+        if incremental:
+            store = KlineStore("sse_stock")
+            fetch = lambda stock: store.update(stock, lambda begin: self.get_single_stock_eod(stock, begin=begin))
+        downloader = HistoryDownloader("sse_stock", fetch, max_workers)
+        eod = downloader.run(_all, on_chunk, resume)
+        self.failed = downloader.failed
         return eod
 
     # ongoing
     def get_eod(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
+        r = self.session.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         eod = pd.DataFrame(data["list"], columns=["InstrumentID", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
         eod["TradingDay"] = data["date"]
         eod = eod[self.eod_columns]
@@ -98,59 +107,55 @@ class Bond:
 
     def __init__(self):
         self.bond_list_url = "http://query.sse.com.cn/sseQuery/commonSoaQuery.do?jsonCallBack=jsonpCallback64754136&sqlId=CP_ZQ_ZQLB&BOND_TYPE=%E5%85%A8%E9%83%A8&_={t}"
-        self.bond_eod_url = "http://yunhq.sse.com.cn:32041/v1/shb1/dayk/{bond}?callback=jQuery112402788803963488542_{t}&begin=0&end=-1&period=day&_={t}"
+        self.bond_eod_url = "http://yunhq.sse.com.cn:32041/v1/shb1/dayk/{bond}?callback=jQuery112402788803963488542_{t}&begin={begin}&end=-1&period=day&_={t}"
 
         self.eod_url = "http://yunhq.sse.com.cn:32041/v1/shb1/list/exchange/all?callback=jsonpCallback62585600&select=code%2Copen%2Chigh%2Clow%2Clast%2Cvolume%2Camount%2C&order=&begin=0&end=-1&_={t}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
+        self.failed = {}
 
     def get_bond_list(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.bond_list_url.format(t=t), headers=self.headers, timeout=30)
-        data = json.loads(r.text.split("(", 1)[1][:-1])
+        r = self.session.get(self.bond_list_url.format(t=t), headers=self.headers, timeout=30)
+        data = jsonp(r.content)
         bond_list = pd.DataFrame(data["result"])
         bond_list.set_index("BOND_CODE", inplace=True)
         return bond_list
 
-    def get_single_bond_eod(self, bond: str, date: str = "all") -> pd.DataFrame:
-        t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.bond_eod_url.format(t=t, bond=bond), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
-        eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
-        eod["InstrumentID"] = bond
-        eod = eod[self.eod_columns]
-        if date != "all":
-            eod = eod[eod["TradingDay"] == int(date)]
-        return eod
+    def get_single_bond_eod(self, bond: str, date: str = "all", begin: int = None) -> pd.DataFrame:
 
-    def get_eod_history(self) -> pd.DataFrame:
+        def fetch(begin: int) -> pd.DataFrame:
+            t = str(time.time() * 1000).split(".")[0]
+            r = self.session.get(self.bond_eod_url.format(t=t, bond=bond, begin=begin), headers=self.headers, timeout=10)
+            data = jsonp(r.content)
+            eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
+            eod["InstrumentID"] = bond
+            return eod[self.eod_columns]
+
+        return dayk(fetch, date, begin)
+
+    def get_eod_history(self, on_chunk=None, max_workers: int = 8, resume: bool = True, incremental: bool = False) -> pd.DataFrame:
+        """incremental: keep a local KlineStore and only fetch bars since its last day"""
         bond_list = self.get_bond_list()
-        eod = pd.DataFrame()
-        for bond in bond_list.index:
-            retry = 0
-            df = pd.DataFrame()
-            while retry < 3:
-                try:
-                    df = self.get_single_bond_eod(bond)
-                    break
-                except IndexError:
-                    break
-                except Exception:
-                    retry += 1
-                    continue
-            eod = pd.concat([eod, df])
+        fetch = self.get_single_bond_eod
+        if incremental:
+            store = KlineStore("sse_bond")
+            fetch = lambda bond: store.update(bond, lambda begin: self.get_single_bond_eod(bond, begin=begin))
+        downloader = HistoryDownloader("sse_bond", fetch, max_workers, empty=(IndexError, ))
+        eod = downloader.run(bond_list.index, on_chunk, resume)
+        self.failed = downloader.failed
         return eod
 
     # ongoing
     def get_eod(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
+        r = self.session.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         eod = pd.DataFrame(data["list"], columns=["InstrumentID", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
         eod["TradingDay"] = data["date"]
         eod = eod[self.eod_columns]
@@ -161,57 +166,55 @@ class Fund:
 
     def __init__(self):
         self.fund_list_url = "http://query.sse.com.cn/commonSoaQuery.do?jsonCallBack=jsonpCallback14059342&sqlId=FUND_LIST&fundType=00%2C10%2C20%2C30%2C40%2C50%2C&order=&_={t}"
-        self.fund_eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/dayk/{fund}?callback=jQuery112409826351965297482_{t}&begin=0&end=-1&period=day&_={t}"
+        self.fund_eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/dayk/{fund}?callback=jQuery112409826351965297482_{t}&begin={begin}&end=-1&period=day&_={t}"
 
         self.eod_url = "http://yunhq.sse.com.cn:32041/v1/sh1/list/exchange/fwr?callback=jsonpCallback87559922&select=code%2Copen%2Chigh%2Clow%2Clast%2Cvolume%2Camount%2C&order=&begin=0&end=-1&_={t}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
+        self.failed = {}
 
     def get_fund_list(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(url=self.fund_list_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(", 1)[1][:-1])
+        r = self.session.get(url=self.fund_list_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         fund_list = pd.DataFrame(data["result"])
         fund_list.set_index("fundCode", inplace=True)
         return fund_list
 
-    def get_single_fund_eod(self, fund: str, date: str = "all") -> pd.DataFrame:
-        t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.fund_eod_url.format(t=t, fund=fund), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
-        eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
-        eod["InstrumentID"] = fund
-        eod = eod[self.eod_columns]
-        if date != "all":
-            eod = eod[eod["TradingDay"] == int(date)]
-        return eod
+    def get_single_fund_eod(self, fund: str, date: str = "all", begin: int = None) -> pd.DataFrame:
 
-    def get_eod_history(self) -> pd.DataFrame:
+        def fetch(begin: int) -> pd.DataFrame:
+            t = str(time.time() * 1000).split(".")[0]
+            r = self.session.get(self.fund_eod_url.format(t=t, fund=fund, begin=begin), headers=self.headers, timeout=10)
+            data = jsonp(r.content)
+            eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
+            eod["InstrumentID"] = fund
+            return eod[self.eod_columns]
+
+        return dayk(fetch, date, begin)
+
+    def get_eod_history(self, on_chunk=None, max_workers: int = 8, resume: bool = True, incremental: bool = False) -> pd.DataFrame:
+        """incremental: keep a local KlineStore and only fetch bars since its last day"""
         fund_list = self.get_fund_list()
-        eod = pd.DataFrame()
-        for fund in fund_list.index:
-            df = pd.DataFrame()
-            retry = 0
-            while retry < 3:
-                try:
-                    df = self.get_single_fund_eod(fund)
-                    break
-                except:
-                    retry += 1
-                    continue
-            eod = pd.concat([eod, df])
+        fetch = self.get_single_fund_eod
+        if incremental:
+            store = KlineStore("sse_fund")
+            fetch = lambda fund: store.update(fund, lambda begin: self.get_single_fund_eod(fund, begin=begin))
+        downloader = HistoryDownloader("sse_fund", fetch, max_workers)
+        eod = downloader.run(fund_list.index, on_chunk, resume)
+        self.failed = downloader.failed
         return eod
 
     # ongoing
     def get_eod(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
+        r = self.session.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         eod = pd.DataFrame(data["list"], columns=["InstrumentID", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
         eod["TradingDay"] = data["date"]
         eod = eod[self.eod_columns]
@@ -227,15 +230,15 @@ class Index:
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
 
     # ongoing
     def get_eod(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
+        r = self.session.get(self.eod_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         eod = pd.DataFrame(
             data["list"], columns=["InstrumentID", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
         )
@@ -254,39 +257,40 @@ class Option:
         self.eod_columns = ["InstrumentID", "TradingDay", "SettlePrice", "PreSettlePrice"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
 
     def get_ref(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(url=self.ref_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(", 1)[1][:-1])
+        r = self.session.get(url=self.ref_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         ref = pd.DataFrame(data["result"])
         ref.set_index("SECURITY_ID", inplace=True)
         return ref
 
     def get_underlying_expiremonth(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.expiremonth_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
+        r = self.session.get(self.expiremonth_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         ue = pd.DataFrame(data["list"], columns=["Underlying", "ExpireMonth"])
         ue["ExpireMonth"] = ue["ExpireMonth"].map(lambda x: str(x)[-2:])
         return ue
 
+    def get_chain_eod(self, underlying: str, expiremonth: str, t: str) -> pd.DataFrame:
+        r = self.session.get(self.eod_url.format(underlying=underlying, expiremonth=expiremonth, t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
+        df = pd.DataFrame(data["list"], columns=["InstrumentID", "SettlePrice", "PreSettlePrice"])
+        df["TradingDay"] = data["date"]
+        return df[self.eod_columns]
+
     # ongoing
-    def get_eod(self) -> pd.DataFrame:
+    def get_eod(self, max_workers: int = 8) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
         ue = self.get_underlying_expiremonth()
-        eod = pd.DataFrame()
-        for _, row in ue.iterrows():
-            r = requests.get(self.eod_url.format(underlying=row["Underlying"], expiremonth=row["ExpireMonth"], t=t), headers=self.headers, timeout=10)
-            data = json.loads(r.text.split("(", 1)[1][:-1])
-            df = pd.DataFrame(data["list"], columns=["InstrumentID", "SettlePrice", "PreSettlePrice"])
-            df["TradingDay"] = data["date"]
-            df = df[self.eod_columns]
-            eod = pd.concat([eod, df])
-        return eod
+        pairs = zip(ue["Underlying"], ue["ExpireMonth"])
+        dfs = run_parallel(lambda pair: self.get_chain_eod(*pair, t), pairs, max_workers)
+        return pd.concat(dfs) if dfs else pd.DataFrame()
 
 
 class Repo:
@@ -294,37 +298,38 @@ class Repo:
     def __init__(self):
         self.repo_list_url = "http://query.sse.com.cn/commonQuery.do?jsonCallBack=jsonpCallback68949527&isPagination=true&pageHelp.pageSize=1000&pageHelp.pageNo=1&sqlId=COMMON_SSE_ZQPZ_ZQLB_ZQHGLB_TOTAL&_={t}"
 
-        self.eod_url = "http://yunhq.sse.com.cn:32041/v1/shb1/dayk/{repo}?callback=jQuery11240494446136766604_{t}&begin=0&end=-1&period=day&_={t}"
+        self.eod_url = "http://yunhq.sse.com.cn:32041/v1/shb1/dayk/{repo}?callback=jQuery11240494446136766604_{t}&begin={begin}&end=-1&period=day&_={t}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
 
         self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36",
             "Referer": "http://www.sse.com.cn/"
         }
+        self.session = get_pool()
 
     def get_repo_list(self) -> pd.DataFrame:
         t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(url=self.repo_list_url.format(t=t), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(", 1)[1][:-1])
+        r = self.session.get(url=self.repo_list_url.format(t=t), headers=self.headers, timeout=10)
+        data = jsonp(r.content)
         repo_list = pd.DataFrame(data["result"])
         repo_list.set_index("BOND_ID", inplace=True)
         return repo_list
 
-    def get_single_repo_eod(self, repo: str, date: str = "all") -> pd.DataFrame:
-        t = str(time.time() * 1000).split(".")[0]
-        r = requests.get(self.eod_url.format(t=t, repo=repo), headers=self.headers, timeout=10)
-        data = json.loads(r.text.split("(")[1][:-1])
-        eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
-        eod["InstrumentID"] = repo
-        eod = eod[self.eod_columns]
-        if date != "all":
-            eod = eod[eod["TradingDay"] == int(date)]
-        return eod
+    def get_single_repo_eod(self, repo: str, date: str = "all", begin: int = None) -> pd.DataFrame:
 
-    def get_eod(self, date: str = "all") -> pd.DataFrame:
+        def fetch(begin: int) -> pd.DataFrame:
+            t = str(time.time() * 1000).split(".")[0]
+            r = self.session.get(self.eod_url.format(t=t, repo=repo, begin=begin), headers=self.headers, timeout=10)
+            data = jsonp(r.content)
+            eod = pd.DataFrame(data["kline"], columns=["TradingDay", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"])
+            eod["InstrumentID"] = repo
+            return eod[self.eod_columns]
+
+        return dayk(fetch, date, begin)
+
+    def get_eod(self, date: str = "all", on_chunk=None) -> pd.DataFrame:
         repo_list = self.get_repo_list()
-        eod = pd.DataFrame()
+        eod = Collector(on_chunk=on_chunk)
         for repo in repo_list.index:
             retry = 0
             df = pd.DataFrame()
@@ -337,8 +342,8 @@ class Repo:
                 except Exception:
                     retry += 1
                     continue
-            eod = pd.concat([eod, df])
-        return eod
+            eod.append(df)
+        return eod.result()
 
 
 if __name__ == "__main__":
@@ -3,169 +3,311 @@
 Date: 2023/09/22
 Desc: 深交所
 """
-import requests
+import sys
 import pandas as pd
+from pathlib import Path
 from random import random
-from decimal import Decimal
+from datetime import datetime, timedelta
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.excel import read_excel
+from tools.fixed import eod_scales, to_fixed
+from tools.normalize import decimal, strip
+from tools.parallel import run_parallel
+from tools.session import get_pool
+from tools.tradingday import CN_TradingDay
+
+
+def dashed(date: str) -> str:
+    return "-".join([date[:4], date[4:6], date[6:]])
+
+
+def eod_range(adapter, start: str, end: str, window: int = 31) -> dict:
+    """
+        {TradingDay: eod} for start..end, one ShowReport per window of natural days
+        instead of one per day. A window is fetched in halves when the report looks
+        cut off by the server: fewer 交易日期 than it has trading days, or fewer rows
+        for the day it stops on than that day has on its own. Days past the end of
+        the trading calendar cannot be counted and are fetched one per request.
+    """
+    tradingday = CN_TradingDay()
+    covered = datetime.strptime(str(tradingday.all()[-1]), "%Y%m%d")
+
+    def truncated(raw: pd.DataFrame, begin: str, end: str) -> bool:
+        days = raw["交易日期"]
+        if days.nunique() < len(tradingday.get_range(begin, end)):
+            return True
+        if not len(raw):
+            return False
+        # a cap inside the last day reported leaves the day count intact
+        cut = days.iloc[-1]
+        day = cut.replace("-", "")
+        return (days == cut).sum() < len(adapter.download(day, day))
+
+    def fetch(begin: datetime, end: datetime) -> list:
+        raw = adapter.download(begin.strftime("%Y%m%d"), end.strftime("%Y%m%d"))
+        if begin < end and truncated(raw, begin.strftime("%Y%m%d"), end.strftime("%Y%m%d")):
+            middle = begin + (end - begin) // 2
+            return fetch(begin, middle) + fetch(middle + timedelta(days=1), end)
+        return [raw]
+
+    raws = []
+    begin, last = datetime.strptime(start, "%Y%m%d"), datetime.strptime(end, "%Y%m%d")
+    while begin <= last:
+        stop = min(begin + timedelta(days=window - 1), last)
+        if begin > covered:
+            stop = begin
+        elif stop > covered:
+            stop = covered
+        raws += fetch(begin, stop)
+        begin = stop + timedelta(days=1)
+    if not raws:
+        return {}
+    eod = adapter.parse(pd.concat(raws, ignore_index=True))
+    return {day: df.reset_index(drop=True) for day, df in eod.groupby("TradingDay", sort=True)}
 
 
 class SZE:
 
-    def __init__(self) -> None:
-        self.stock = Stock()
-        self.bond = Bond()
-        self.fund = Fund()
-        self.index = Index()
-        self.option = Option()
-        self.repo = Repo()
+    def __init__(self, fixed: bool = False) -> None:
+        self.stock = Stock(fixed)
+        self.bond = Bond(fixed)
+        self.fund = Fund(fixed)
+        self.index = Index(fixed)
+        self.option = Option(fixed)
+        self.repo = Repo(fixed)
+        # tab that failed in the last get_all_eod -> exception
+        self.failed = {}
+
+    def get_all_eod(self, date: str, max_workers: int = 6) -> dict:
+        """
+            {name: eod} for every tab on date, each tab downloads and parses on its
+            own thread over the shared session pool. A tab that raises is left out
+            and its exception kept in self.failed, the other tabs are still returned.
+        """
+        adapters = {"stock": self.stock, "bond": self.bond, "fund": self.fund, "index": self.index, "option": self.option, "repo": self.repo}
+
+        def fetch(name):
+            try:
+                return adapters[name].get_eod(date)
+            except Exception as e:
+                return e
+
+        self.failed = {}
+        eod = {}
+        for name, result in zip(adapters, run_parallel(fetch, adapters, max_workers)):
+            if isinstance(result, Exception):
+                self.failed[name] = result
+            else:
+                eod[name] = result
+        return eod
 
 
 class Stock:
 
-    def __init__(self):
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab1&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-07-01&random={randid}"
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab1&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-07-01&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
+        # report columns parse() needs, in eod_columns order
+        self.raw_columns = ["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交量(万股)", "成交金额(万元)"]
+
+        self.session = get_pool()
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交量(万股)", "成交金额(万元)"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
-        eod["InstrumentID"] = eod["InstrumentID"].map(lambda x: str(x).zfill(6))
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
-        eod["Volume"] = eod["Volume"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
+        eod["InstrumentID"] = eod["InstrumentID"].astype(str).str.zfill(6)
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Volume": 4, "Turnover": 4})
+        eod["Volume"] = decimal(eod["Volume"], 4)
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Bond:
 
-    def __init__(self):
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab3&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-07-01&random={randid}"
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab3&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-07-01&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Turnover"]
+        self.raw_columns = ["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交金额(万元)"]
+
+        self.session = get_pool()
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交金额(万元)"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Fund:
 
-    def __init__(self):
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab2&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-07-01&random={randid}"
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab2&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-07-01&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Volume", "Turnover"]
+        self.raw_columns = ["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交量（万份）", "成交金额(万元)"]
+
+        self.session = get_pool()
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["证券代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交量（万份）", "成交金额(万元)"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
-        eod["Volume"] = eod["Volume"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(x.replace(",", "")) * 10000)
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Volume": 4, "Turnover": 4})
+        eod["Volume"] = decimal(eod["Volume"], 4)
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 class Index:
 
-    def __init__(self):
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab7&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-07-01&random={randid}"
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab7&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-07-01&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "OpenPrice", "HighPrice", "LowPrice", "ClosePrice", "Turnover"]
+        self.raw_columns = ["指数代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交金额(亿元)"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
+
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["指数代码", "交易日期", "前收", "开盘", "最高", "最低", "今收", "成交金额(亿元)"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(x.replace(",", "")) * 100000000)
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 8})
+        eod["Turnover"] = decimal(eod["Turnover"], 8)
         return eod
 
 
 class Option:
 
-    def __init__(self):
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
         self.ref_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=option_drhy&TABKEY=tab1&random={randid}"
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab6&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-08-02&random={randid}"
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab6&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-08-02&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreSettlePrice", "ClosePrice", "SettlePrice", "Volume"]
+        self.raw_columns = ["合约编码", "交易日期", "前结算价", "今收盘价", "今结算价", "成交量（张）"]
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
 
     def get_ref(self) -> pd.DataFrame:
-        r = requests.get(url=self.ref_url.format(randid=random()), headers=self.headers, timeout=10)
-        ref = pd.read_excel(r.content)
+        r = self.session.get(url=self.ref_url.format(randid=random()), timeout=10)
+        ref = read_excel(r.content)
         return ref
 
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
+
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["合约编码", "交易日期", "前结算价", "今收盘价", "今结算价", "成交量（张）"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns))
         return eod
 
 
 class Repo:
 
-    def __init__(self):
-        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab4&txtBeginDate={date}&txtEndDate={date}&archiveDate=2021-07-01&random={randid}"
+    def __init__(self, fixed: bool = False):
+        self.fixed = fixed
+        self.eod_url = "https://www.szse.cn/api/report/ShowReport?SHOWTYPE=xlsx&CATALOGID=1815_stock_snapshot&TABKEY=tab4&txtBeginDate={begin}&txtEndDate={end}&archiveDate=2021-07-01&random={randid}"
 
         self.eod_columns = ["InstrumentID", "TradingDay", "PreClosePrice", "ClosePrice", "Turnover"]
+        self.raw_columns = ["证券代码", "交易日期", "前收", "今收", "成交金额(万元)"]
+
+        self.session = get_pool()
 
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+    def download(self, begin: str, end: str) -> pd.DataFrame:
+        r = self.session.get(url=self.eod_url.format(begin=dashed(begin), end=dashed(end), randid=random()), timeout=10)
+        return read_excel(r.content, usecols=self.raw_columns)
 
     def get_eod(self, date: str) -> pd.DataFrame:
-        r = requests.get(url=self.eod_url.format(date="-".join([date[:4], date[4:6], date[6:]]), randid=random()), headers=self.headers, timeout=10)
-        eod = pd.read_excel(r.content, engine="openpyxl")
-        eod = eod[["证券代码", "交易日期", "前收", "今收", "成交金额(万元)"]]
+        return self.parse(self.download(date, date))
+
+    def get_eod_range(self, start: str, end: str, window: int = 31) -> dict:
+        return eod_range(self, start, end, window)
+
+    def parse(self, eod: pd.DataFrame) -> pd.DataFrame:
+        eod = eod[self.raw_columns]
         eod.columns = self.eod_columns
         eod = eod[~eod["InstrumentID"].isna()]
-        eod["TradingDay"] = eod["TradingDay"].map(lambda x: x.replace("-", ""))
-        eod["Turnover"] = eod["Turnover"].map(lambda x: Decimal(str(x)) * 10000)
+        eod["TradingDay"] = strip(eod["TradingDay"], "-")
+        if self.fixed:
+            return to_fixed(eod, eod_scales(eod.columns), shift={"Turnover": 4})
+        eod["Turnover"] = decimal(eod["Turnover"], 4)
         return eod
 
 
 if __name__ == "__main__":
     sze = SZE()
     import sys
-    from datetime import datetime
 
     from loguru import logger
     date = sys.argv[1] if len(sys.argv) > 1 else datetime.today().strftime("%Y%m%d")
     logger.info(f"Run {date}")
-    print(sze.stock.get_eod(date))
-    print(sze.bond.get_eod(date))
-    print(sze.fund.get_eod(date))
-    print(sze.index.get_eod(date))
-    print(sze.option.get_eod(date))
-    print(sze.repo.get_eod(date))
+    for name, eod in sze.get_all_eod(date).items():
+        print(name, eod)
+    for name, e in sze.failed.items():
+        logger.error(f"{name}: {e!r}")
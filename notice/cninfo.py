@@ -1,6 +1,12 @@
+import sys
 import pandas as pd
-import requests
 from loguru import logger
+from pathlib import Path
+
+parent_path = str(Path(__file__).parents[1])
+sys.path.append(parent_path)
+from tools.decode import loads
+from tools.session import get_pool
 
 
 class CNINFO:
@@ -8,19 +14,17 @@ class CNINFO:
     def __init__(self, date: str) -> None:
         self.date = "-".join([date[:4], date[4:6], date[6:]])
         self.url = "http://www.cninfo.com.cn/new/information/memoQuery"
-        self.headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
-        }
+        self.session = get_pool()
         logger.info(f"Start {self.date}")
 
     def query_data(self) -> dict:
         para = {
             "queryDate": self.date
         }
-        r = requests.post(url=self.url, headers=self.headers, data=para, timeout=10)
-        raw = pd.DataFrame(r.json()["clusterSRTbTrade0112"]["srTbTrade0112s"])
+        r = self.session.post(url=self.url, data=para, timeout=10)
+        raw = loads(r.content)["clusterSRTbTrade0112"]["srTbTrade0112s"]
         data = {}
-        for _, row in raw.iterrows():
+        for row in raw:
             data[row["tradingTipsName"]] = pd.DataFrame(row["tbTrade0112s"])
         return data
 
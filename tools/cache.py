@@ -0,0 +1,122 @@
+# -* - coding: UTF-8 -* -
+import os
+import json
+import uuid
+import pickle
+import hashlib
+import threading
+import pandas as pd
+from pathlib import Path
+from collections import OrderedDict
+
+# on-disk cache, ZQ_CACHE overrides the repo local cache/ directory
+cache_path = os.environ.get("ZQ_CACHE", os.path.join(Path(__file__).parents[1], "cache"))
+
+
+class LRUCache:
+    """bounded in-process cache, least recently used entry is evicted first"""
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# parsed eod frames keyed by (exchange, product type, date, ...)
+eod_cache = LRUCache(maxsize=64)
+
+
+def cached_frame(cache: LRUCache, key, load) -> pd.DataFrame:
+    """load() on miss, callers always get their own copy of the cached frame"""
+    df = cache.get(key)
+    if df is None:
+        df = load()
+        cache.put(key, df)
+    return df.copy()
+
+
+def atomic_write(filename: str, data: bytes):
+    """write to a temp file beside filename then rename over it"""
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    tmp = f"{filename}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_json(name: str):
+    """cache_path/name.json, None when missing or unreadable"""
+    try:
+        with open(os.path.join(cache_path, f"{name}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_json(name: str, data):
+    atomic_write(os.path.join(cache_path, f"{name}.json"), json.dumps(data, ensure_ascii=False, indent=1).encode("utf-8"))
+
+
+def conditional_frame(session, url: str, parse, **kwargs) -> pd.DataFrame:
+    """
+        GET url revalidating against cache_path/http/, parse(body) -> DataFrame.
+        The raw body, the pickled frame and ETag / Last-Modified are kept per url.
+        304, or a 200 whose body hashes the same as the stored one, skips the parse.
+    """
+    key = "http/" + hashlib.sha1(url.encode("utf-8")).hexdigest()
+    base = os.path.join(cache_path, key)
+    meta = load_json(key) or {}
+    headers = dict(kwargs.pop("headers", None) or {})
+    if meta and os.path.exists(f"{base}.pkl"):
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    else:
+        meta = {}
+    r = session.get(url, headers=headers, **kwargs)
+    if r.status_code == 304 and meta:
+        with open(f"{base}.pkl", "rb") as f:
+            return pickle.load(f)
+    digest = hashlib.sha1(r.content).hexdigest()
+    if meta.get("sha1") == digest:
+        with open(f"{base}.pkl", "rb") as f:
+            df = pickle.load(f)
+    else:
+        df = parse(r.content)
+        if r.status_code == 200:
+            atomic_write(f"{base}.body", r.content)
+            atomic_write(f"{base}.pkl", pickle.dumps(df))
+    if r.status_code == 200:
+        meta = {"url": url, "etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified"), "sha1": digest}
+        save_json(key, meta)
+    return df
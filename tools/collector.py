@@ -0,0 +1,38 @@
+# -* - coding: UTF-8 -* -
+import pandas as pd
+
+
+class Collector:
+    """
+        Accumulates frames from a fetch loop and concatenates them once.
+        With on_chunk set, every chunk_size rows are concatenated and handed
+        to on_chunk instead of being kept, so memory stays bounded.
+    """
+
+    def __init__(self, chunk_size: int = 100000, on_chunk=None):
+        self.chunk_size = chunk_size
+        self.on_chunk = on_chunk
+        self._frames = []
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, df: pd.DataFrame):
+        self._frames.append(df)
+        self._rows += len(df)
+        if self.on_chunk is not None and self._rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._frames and self.on_chunk is not None:
+            self.on_chunk(pd.concat(self._frames))
+            self._frames = []
+            self._rows = 0
+
+    def result(self) -> pd.DataFrame:
+        """all frames not yet handed to on_chunk, as one frame"""
+        self.flush()
+        if not self._frames:
+            return pd.DataFrame()
+        return pd.concat(self._frames)
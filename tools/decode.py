@@ -0,0 +1,33 @@
+# -* - coding: UTF-8 -* -
+"""
+    JSON / JSONP bodies straight from response bytes, orjson when installed.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(content):
+    """bytes / memoryview / str -> parsed JSON"""
+    if orjson is not None:
+        return orjson.loads(content)
+    if isinstance(content, memoryview):
+        content = content.tobytes()
+    return json.loads(content)
+
+
+def jsonp(content: bytes):
+    """
+        parsed payload of callback(...), the wrapper is cut on a memoryview so the
+        body is not copied, parentheses inside the payload are fine.
+        Raises IndexError like the old split("(")[1] when there is no wrapper.
+    """
+    start = content.find(b"(")
+    end = content.rfind(b")")
+    if start < 0 or end < start:
+        raise IndexError("not a JSONP response")
+    return loads(memoryview(content)[start + 1:end])
+
@@ -0,0 +1,38 @@
+# -* - coding: UTF-8 -* -
+"""
+    Spreadsheet reading for the exchange exports. calamine (python-calamine, Rust)
+    reads both xls and xlsx and is used when installed, otherwise pandas picks
+    by file format as before (openpyxl for xlsx, xlrd for xls).
+"""
+import importlib.util
+import pandas as pd
+from io import BytesIO
+
+# pandas engine -> module it needs
+ENGINES = {"calamine": "python_calamine", "openpyxl": "openpyxl", "xlrd": "xlrd"}
+_engine = ...
+
+
+def available() -> list:
+    return [engine for engine, module in ENGINES.items() if importlib.util.find_spec(module) is not None]
+
+
+def get_engine():
+    """calamine when installed, None lets pandas choose per file"""
+    global _engine
+    if _engine is ...:
+        _engine = "calamine" if "calamine" in available() else None
+    return _engine
+
+
+def set_engine(engine: str = None):
+    """pin an engine for every read, None for pandas' choice per file"""
+    global _engine
+    if engine is not None and engine not in ENGINES:
+        raise ValueError(f"unknown Excel engine {engine}")
+    _engine = engine
+
+
+def read_excel(content: bytes, usecols: list = None, engine: str = None, **kwargs) -> pd.DataFrame:
+    """xls / xlsx body -> DataFrame, usecols limits the columns that are built"""
+    return pd.read_excel(BytesIO(content), engine=engine or get_engine(), usecols=usecols, **kwargs)
@@ -0,0 +1,156 @@
+# -* - coding: UTF-8 -* -
+"""
+    Vectorized fixed-point helpers, values are carried as int64 scaled by 10**exp
+    and rounded ROUND_HALF_UP the same way as tools.helper.new_round.
+"""
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+
+from tools.helper import new_round
+from tools.normalize import numeric
+
+# significant decimal digits a float64 holds exactly
+DIGITS = 15
+# extra digits kept below exp to see where the half falls
+GUARD = 6
+# default exponent per eod column in fixed mode
+EOD_SCALES = {
+    "PreClosePrice": 4,
+    "BidPrice": 4,
+    "AskPrice": 4,
+    "OpenPrice": 4,
+    "HighPrice": 4,
+    "LowPrice": 4,
+    "ClosePrice": 4,
+    "PreSettlePrice": 4,
+    "SettlePrice": 4,
+    "Volume": 0,
+    "Turnover": 2,
+    "OpenInterest": 0
+}
+
+
+def to_scaled(values, exp=2) -> np.ndarray:
+    """
+        values * 10**exp as int64, same as int(new_round(x, exp).scaleb(exp))
+
+        Each float is read at its shortest repr (like Decimal(str(x))), values
+        that cannot be decided with float arithmetic go through new_round.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    a = np.abs(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        digits = np.floor(np.log10(np.maximum(a, 1))) + 1
+        guard = np.clip(DIGITS - exp - digits, 0, GUARD)
+        guard = np.where(np.isfinite(guard), guard, 0).astype(np.int64)
+        power = 10.0 ** (exp + guard)
+        n = np.rint(a * power)
+        n = np.where(guard > 0, n, 0).astype(np.int64)
+    q = 10 ** guard
+    rem = n % q
+    scaled = np.sign(x).astype(np.int64) * (n // q + (2 * rem >= q))
+    # an exact half is only a half if the scaled value round-trips to x
+    fallback = (guard == 0) | ((2 * rem == q) & (n / power != a))
+    for i in np.flatnonzero(fallback):
+        value = int(new_round(x.flat[i], exp).scaleb(exp))
+        if abs(value) >= 2 ** 63:
+            raise OverflowError(f"{x.flat[i]} * 10**{exp} out of int64 range")
+        scaled.flat[i] = value
+    return scaled
+
+
+def from_scaled(scaled, exp=2) -> np.ndarray:
+    """scaled int64 -> nearest float64"""
+    scaled = np.asarray(scaled, dtype=np.int64)
+    out = scaled / 10.0 ** exp
+    # beyond 2**53 the int64 -> float64 cast rounds before the division does
+    for i in np.flatnonzero(np.abs(scaled) > 2 ** 53):
+        out.flat[i] = int(scaled.flat[i]) / 10 ** exp
+    return out
+
+
+def to_decimal(scaled, exp=2) -> np.ndarray:
+    """scaled int64 -> object array of Decimal with exactly exp decimals"""
+    scaled = np.asarray(scaled, dtype=np.int64)
+    out = np.empty(scaled.shape, dtype=object)
+    out[...] = [Decimal(int(i)).scaleb(-exp) for i in scaled.flat]
+    return out
+
+
+def rescale(scaled, exp, new_exp) -> np.ndarray:
+    """change exponent of scaled int64, ROUND_HALF_UP when dropping digits"""
+    scaled = np.asarray(scaled, dtype=np.int64)
+    if new_exp >= exp:
+        return scaled * 10 ** (new_exp - exp)
+    q = 10 ** (exp - new_exp)
+    a = np.abs(scaled)
+    return np.sign(scaled) * (a // q + (2 * (a % q) >= q))
+
+
+def snap(scaled, tick, how="floor") -> np.ndarray:
+    """snap scaled int64 to a multiple of tick (scaled at the same exp), how: floor / ceil / round"""
+    scaled = np.asarray(scaled, dtype=np.int64)
+    tick = np.asarray(tick, dtype=np.int64)
+    if how == "floor":
+        return scaled // tick * tick
+    if how == "ceil":
+        return -(-scaled // tick) * tick
+    if how == "round":
+        a = np.abs(scaled)
+        return np.sign(scaled) * (a // tick + (2 * (a % tick) >= tick)) * tick
+    raise ValueError(f"unknown snap {how}")
+
+
+def round_half_up(values, prec=2) -> np.ndarray:
+    """vectorized new_round returning float64, NaN stays NaN"""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    finite = np.isfinite(x)
+    out[finite] = from_scaled(to_scaled(x[finite], prec), prec)
+    return out
+
+
+def round_tick(values, tick, prec=2, how="floor") -> np.ndarray:
+    """snap values to a multiple of tick then round to prec, float64 in and out"""
+    exp = prec + GUARD
+    snapped = snap(to_scaled(values, exp), to_scaled(tick, exp), how)
+    return from_scaled(rescale(snapped, exp, prec), prec)
+
+
+def eod_scales(columns) -> dict:
+    return {column: EOD_SCALES[column] for column in columns if column in EOD_SCALES}
+
+
+def to_fixed(df: pd.DataFrame, scales: dict, shift: dict = None) -> pd.DataFrame:
+    """
+        Exact numeric mode, columns in scales become nullable Int64 holding
+        value * 10**scale, shift multiplies by 10**shift on the way in
+        (e.g. Turnover in 万元 -> shift 4). Exponents are kept in df.attrs["scales"].
+        Raises ValueError instead of rounding when a value has more digits than scale.
+    """
+    shift = shift or {}
+    for column, exp in scales.items():
+        values = numeric(df[column]).to_numpy(dtype=np.float64, na_value=np.nan)
+        mask = np.isnan(values)
+        total = exp + shift.get(column, 0)
+        scaled = np.zeros(len(values), dtype=np.int64)
+        scaled[~mask] = to_scaled(values[~mask], total)
+        if (from_scaled(scaled[~mask], total) != values[~mask]).any():
+            raise ValueError(f"{column} has more than {total} decimals, raise its scale")
+        # raw * 10**(exp + shift) is already value * 10**exp
+        df[column] = pd.arrays.IntegerArray(scaled, mask)
+    df.attrs["scales"] = {**df.attrs.get("scales", {}), **scales}
+    return df
+
+
+def from_fixed(df: pd.DataFrame) -> pd.DataFrame:
+    """fixed columns back to Decimal (None for missing), lossless"""
+    df = df.copy()
+    for column, exp in df.attrs.pop("scales", {}).items():
+        values = df[column].array
+        out = np.full(len(values), None, dtype=object)
+        mask = ~values.isna()
+        out[mask] = to_decimal(values[mask].to_numpy(dtype=np.int64), exp)
+        df[column] = out
+    return df
@@ -0,0 +1,134 @@
+# -* - coding: UTF-8 -* -
+import os
+import shutil
+import pickle
+import pandas as pd
+from datetime import datetime
+
+from tools.cache import atomic_write, cache_path
+from tools.collector import Collector
+from tools.parallel import iter_parallel
+
+
+def bars_since(date: str) -> int:
+    """
+        N of a begin=-N request reaching back to date: natural days from date
+        (inclusive) to today, never fewer than the bars in between however far
+        the trading calendar runs, the few extra bars are filtered out
+    """
+    return max((datetime.today() - datetime.strptime(date, "%Y%m%d")).days, 0) + 1
+
+
+def dayk(fetch, date: str = "all", begin: int = None) -> pd.DataFrame:
+    """
+        fetch(begin) -> bars from begin (0 for all, -N for the last N).
+        date "all" returns every bar, otherwise only date's bars, begin defaults
+        to the window reaching back to date
+    """
+    if begin is None:
+        begin = 0 if date == "all" else -bars_since(date)
+    eod = fetch(begin)
+    return eod if date == "all" else eod[eod["TradingDay"] == int(date)]
+
+
+class HistoryDownloader:
+    """
+        Per-instrument history on a thread pool, fetch(instrument) -> DataFrame.
+        Each finished instrument is pickled under cache_path/progress/{name}/{run}/,
+        run defaults to today, so a rerun of the same run after an interruption
+        only fetches what is missing while a later run starts fresh. Progress is
+        dropped once a run finishes without failures, failed instruments are
+        left out of it so the next run retries them.
+    """
+
+    def __init__(self, name: str, fetch, max_workers: int = 8, retries: int = 3, empty: tuple = (), run: str = None):
+        self.root = os.path.join(cache_path, "progress", name)
+        self.path = os.path.join(self.root, run or datetime.today().strftime("%Y%m%d"))
+        self.fetch = fetch
+        self.max_workers = max_workers
+        self.retries = retries
+        # exceptions meaning the instrument has no data, recorded as empty without retrying
+        self.empty = empty
+        # instrument -> last exception, these are missing from the run's result
+        self.failed = {}
+
+    def filename(self, instrument) -> str:
+        return os.path.join(self.path, f"{instrument}.pkl")
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def prune(self):
+        """drop the progress other runs left behind"""
+        if os.path.isdir(self.root):
+            for run in os.listdir(self.root):
+                if os.path.join(self.root, run) != self.path:
+                    shutil.rmtree(os.path.join(self.root, run), ignore_errors=True)
+
+    def download(self, instrument):
+        filename = self.filename(instrument)
+        if os.path.exists(filename):
+            with open(filename, "rb") as f:
+                return pickle.load(f)
+        df = None
+        for _ in range(self.retries):
+            try:
+                df = self.fetch(instrument)
+                break
+            except self.empty:
+                df = pd.DataFrame()
+                break
+            except Exception as e:
+                self.failed[instrument] = e
+        if df is None:
+            return pd.DataFrame()
+        self.failed.pop(instrument, None)
+        atomic_write(filename, pickle.dumps(df))
+        return df
+
+    def run(self, instruments, on_chunk=None, resume: bool = True) -> pd.DataFrame:
+        """instruments in order, see Collector for on_chunk"""
+        self.prune()
+        if not resume:
+            self.clear()
+        self.failed = {}
+        eod = Collector(on_chunk=on_chunk)
+        for df in iter_parallel(self.download, instruments, self.max_workers):
+            eod.append(df)
+        if not self.failed:
+            self.clear()
+        return eod.result()
+
+
+class KlineStore:
+    """
+        Local per-instrument k-line under cache_path/kline/{name}/. The first
+        update stores the full history, later ones fetch only the bars from the
+        last stored day on and replace the overlap.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(cache_path, "kline", name)
+
+    def filename(self, instrument) -> str:
+        return os.path.join(self.path, f"{instrument}.pkl")
+
+    def load(self, instrument) -> pd.DataFrame:
+        """stored bars, None before the first update"""
+        filename = self.filename(instrument)
+        if not os.path.exists(filename):
+            return None
+        with open(filename, "rb") as f:
+            return pickle.load(f)
+
+    def update(self, instrument, fetch) -> pd.DataFrame:
+        """fetch(begin) -> bars from begin (0 for all, -N for the last N), returns the stored history"""
+        stored = self.load(instrument)
+        if stored is None or stored.empty:
+            df = fetch(0)
+        else:
+            last = stored["TradingDay"].iloc[-1]
+            bars = fetch(-bars_since(str(last)))
+            df = pd.concat([stored[~stored["TradingDay"].isin(bars["TradingDay"])], bars], ignore_index=True)
+        atomic_write(self.filename(instrument), pickle.dumps(df))
+        return df
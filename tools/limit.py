@@ -0,0 +1,55 @@
+# -* - coding: UTF-8 -* -
+"""
+    涨跌停价: pre_settle * (1 ± limit), floor to tick size, round to prec.
+    Vectorized on scaled int64, same Decimal results as the per-row calculation.
+"""
+import numpy as np
+import pandas as pd
+from math import floor
+from decimal import Decimal
+
+from tools.fixed import from_scaled, rescale, to_decimal, to_scaled
+from tools.helper import new_round
+
+# exponent inputs are scaled to, rows with more digits take the Decimal path
+EXP = 4
+
+
+def calc_limit(pre_settle, limit, tick_size, side="upper", prec=2) -> Decimal:
+    pre_settle = Decimal(str(pre_settle))
+    limit = Decimal(str(limit))
+    tick_size = Decimal(str(tick_size))
+    price = pre_settle * (1 + limit) if side == "upper" else pre_settle * (1 - limit)
+    return new_round(floor(price / tick_size) * tick_size, prec)
+
+
+def to_float(values: pd.Series) -> np.ndarray:
+    if not pd.api.types.is_numeric_dtype(values):
+        values = pd.to_numeric(values.astype(str), errors="coerce")
+    return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def limit_price(pre_settle, limit, tick_size, side="upper", prec=2) -> np.ndarray:
+    """
+        pre_settle, limit (ratio, 0.05 for 5%), tick_size: array-like of str / number / Decimal
+        side: upper / lower, returns object array of Decimal with prec decimals
+    """
+    columns = [pd.Series(np.asarray(values, dtype=object)) for values in (pre_settle, limit, tick_size)]
+    p, l, t = (to_float(values) for values in columns)
+    exact = np.isfinite(p) & np.isfinite(l) & np.isfinite(t) & (t > 0) & (np.abs(p) < 1e9)
+    scaled = []
+    for x in (p, l, t):
+        n = np.zeros(len(x), dtype=np.int64)
+        n[exact] = to_scaled(x[exact], EXP)
+        exact &= from_scaled(n, EXP) == np.where(exact, x, 0)
+        scaled.append(n)
+    p_n, l_n, t_n = scaled
+    one = 10 ** EXP
+    # price at 10**(2 * EXP), tick brought to the same scale before the floor division
+    price = p_n * (one + l_n if side == "upper" else one - l_n)
+    ticks = price // np.where(exact, t_n * one, 1)
+    out = np.empty(len(p), dtype=object)
+    out[exact] = to_decimal(rescale(ticks[exact] * t_n[exact], EXP, prec), prec)
+    for i in np.flatnonzero(~exact):
+        out[i] = calc_limit(*(values[i] for values in columns), side, prec)
+    return out
@@ -0,0 +1,39 @@
+# -* - coding: UTF-8 -* -
+"""
+    Column-wise cleanup of the numbers exchanges export as text ("1,234.56"),
+    done with the str accessor / to_numeric over the whole column instead of a
+    Python callback per cell.
+"""
+import numpy as np
+import pandas as pd
+from decimal import Decimal
+
+as_decimal = np.frompyfunc(Decimal, 1, 1)
+
+
+def strip(values: pd.Series, chars: str = ",") -> pd.Series:
+    """drop chars from the str cells, NaN and numeric cells are kept as they are"""
+    kind = pd.api.types.infer_dtype(values, skipna=True)
+    if kind not in ("string", "mixed", "mixed-integer"):
+        return values
+    out = values
+    for char in chars:
+        out = out.str.replace(char, "", regex=False)
+    # the str accessor gives NaN for the cells that are not str
+    return out if kind == "string" else out.where(out.notna(), values)
+
+
+def numeric(values: pd.Series) -> pd.Series:
+    """text numbers -> float, thousands separators and padding removed, unparsable -> NaN, numeric columns pass through"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values
+    return pd.to_numeric(values.astype(str).str.replace(",", "", regex=False).str.strip(), errors="coerce")
+
+
+def decimal(values: pd.Series, scale: int = 0) -> pd.Series:
+    """exact path, Decimal(text without ",") * 10**scale, the digits the exchange printed are kept"""
+    text = values.astype(str).str.replace(",", "", regex=False).to_numpy(dtype=object)
+    out = as_decimal(text)
+    if scale:
+        out = out * Decimal(10 ** scale)
+    return pd.Series(out, index=values.index, dtype=object)
@@ -0,0 +1,32 @@
+# -* - coding: UTF-8 -* -
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+
+def run_parallel(func, items, max_workers: int = 8) -> list:
+    """func over items on a thread pool, results in the order of items, first exception is raised"""
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_parallel(func, items, max_workers: int = 8):
+    """
+        run_parallel as a generator, each result is yielded in the order of items
+        once it is ready and at most 2 * max_workers are submitted ahead of the
+        consumer, so finished results are not all held at once
+    """
+    items = iter(items)
+    if max_workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(executor.submit(func, item) for item in islice(items, 2 * max_workers))
+        while pending:
+            result = pending.popleft().result()
+            pending.extend(executor.submit(func, item) for item in islice(items, 1))
+            yield result
@@ -0,0 +1,131 @@
+# -* - coding: UTF-8 -* -
+import time
+import threading
+import requests
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36"
+
+
+class SessionPool:
+    """
+        One keep-alive requests.Session per host, shared by every adapter so
+        repeated requests to the same exchange reuse TCP/TLS connections.
+    """
+
+    def __init__(self, pool_size: int = 10, headers: dict = None, max_inflight: int = None, rate: float = None):
+        self.pool_size = pool_size
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        # cap on concurrent requests per host, None for no cap
+        self.max_inflight = max_inflight
+        # requests per second per host, None for no limit
+        self.rate = rate
+        self._sessions = {}
+        self._inflight = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+
+    def configure(self, pool_size: int = None, headers: dict = None, max_inflight: int = None, rate: float = None):
+        """
+            change pool size / default headers / in-flight cap / rate, safe while requests are running.
+            Limits apply to the next request, in-flight ones still count against the new cap.
+            Headers are updated on the open sessions, a new pool size gives new sessions
+            to later requests while running ones finish on the old sessions.
+        """
+        with self._lock:
+            if headers is not None:
+                self.headers.update(headers)
+                for session in self._sessions.values():
+                    session.headers.update(headers)
+            if pool_size is not None and pool_size != self.pool_size:
+                self.pool_size = pool_size
+                # not closed, requests still running on them hold a reference
+                self._sessions = {}
+            if max_inflight is not None:
+                self.max_inflight = max_inflight
+                self._released.notify_all()
+            if rate is not None:
+                self.rate = rate
+
+    def session(self, url: str) -> requests.Session:
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers.update(self.headers)
+                    self._sessions[host] = session
+        return session
+
+    @contextmanager
+    def inflight(self, url: str):
+        """hold one of the host's max_inflight slots, counted per host so the cap can change"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            while self.max_inflight and self._inflight.get(host, 0) >= self.max_inflight:
+                self._released.wait()
+            self._inflight[host] = self._inflight.get(host, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight[host] -= 1
+                self._released.notify_all()
+
+    def throttle(self, url: str):
+        """sleep until the host's next slot, slots are 1 / rate apart"""
+        if not self.rate:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + 1 / self.rate
+        if slot > now:
+            time.sleep(slot - now)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        self.throttle(url)
+        with self.inflight(url):
+            return self.session(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        """close every session, only once no request is running"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            self._next_slot.clear()
+
+
+default_pool = SessionPool()
+
+
+def iter_lines(resp: requests.Response, encoding: str = None, chunk_size: int = 1 << 16):
+    """decoded lines of a stream=True response, same as resp.text.split("\\r\\n") without holding the text"""
+    encoding = encoding or resp.encoding or "utf-8"
+    pending = b""
+    for chunk in resp.iter_content(chunk_size):
+        lines = (pending + chunk).split(b"\r\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.decode(encoding, errors="replace")
+    yield pending.decode(encoding, errors="replace")
+
+
+def get_pool() -> SessionPool:
+    return default_pool
@@ -0,0 +1,93 @@
+# -* - coding: UTF-8 -* -
+import os
+import uuid
+import tempfile
+import pandas as pd
+
+# file suffix per format, csv also gets the compression suffix
+FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+CSV_COMPRESSION = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz", "zstd": ".zst", "zip": ".zip"}
+
+
+def columnar(df: pd.DataFrame) -> pd.DataFrame:
+    """object columns arrow cannot type (Decimal mixed with int 0, str mixed with 0) are written as str"""
+    import pyarrow as pa
+
+    df = df.reset_index(drop=True)
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].astype(str)
+    return df
+
+
+class Sink:
+    """
+        Where adapters persist their output, fmt: csv / parquet / feather.
+        compression goes to the writer (csv: gzip / bz2 / xz / zstd / zip,
+        parquet: snappy / zstd / gzip, feather: lz4 / zstd).
+        Each write lands in a temp file next to the target and is renamed over
+        it, readers never see half a file and concurrent runs cannot interleave.
+    """
+
+    def __init__(self, path: str = None, fmt: str = "csv", compression: str = None, enabled: bool = True):
+        self.path = path or tempfile.gettempdir()
+        self.fmt = fmt
+        self.compression = compression
+        self.enabled = enabled
+
+    def configure(self, path: str = None, fmt: str = None, compression: str = None, enabled: bool = None):
+        if path is not None:
+            self.path = path
+        if fmt is not None:
+            self.fmt = fmt
+        if compression is not None:
+            self.compression = compression
+        if enabled is not None:
+            self.enabled = enabled
+
+    def filename(self, name: str) -> str:
+        if self.fmt not in FORMATS:
+            raise ValueError(f"unknown sink format {self.fmt}")
+        suffix = FORMATS[self.fmt]
+        if self.fmt == "csv" and self.compression:
+            suffix += CSV_COMPRESSION[self.compression]
+        return os.path.join(self.path, name + suffix)
+
+    def write(self, df: pd.DataFrame, name: str):
+        """write df as name, returns the file written or None when disabled"""
+        if not self.enabled:
+            return None
+        dest = self.filename(name)
+        os.makedirs(self.path, exist_ok=True)
+        tmp = os.path.join(self.path, f".{name}.{uuid.uuid4().hex}.tmp")
+        try:
+            if self.fmt == "csv":
+                df.to_csv(tmp, index=False, compression=self.compression)
+            elif self.fmt == "parquet":
+                columnar(df).to_parquet(tmp, index=False, compression=self.compression or "snappy")
+            else:
+                columnar(df).to_feather(tmp, compression=self.compression)
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return dest
+
+    def read(self, name: str) -> pd.DataFrame:
+        filename = self.filename(name)
+        if self.fmt == "csv":
+            return pd.read_csv(filename, compression=self.compression, dtype=str)
+        if self.fmt == "parquet":
+            return pd.read_parquet(filename)
+        return pd.read_feather(filename)
+
+
+# same files as before (/tmp/{name}.csv), configure() to switch format or turn off
+default_sink = Sink()
+
+
+def get_sink() -> Sink:
+    return default_sink
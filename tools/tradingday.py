@@ -1,27 +1,69 @@
 # -* - coding: UTF-8 -* -
 import os
-import pandas as pd
-from datetime import datetime
+import numpy as np
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from functools import cached_property
 from pathlib import Path
 
 calendar_path = os.path.join(Path(__file__).parents[1], "calendar")
 
 
-class NaturalDay:
+def to_ymd(days) -> np.ndarray:
+    """str / int / datetime64 dates (array, Series or list) -> int32 yyyymmdd array"""
+    days = np.asarray(days)
+    if np.issubdtype(days.dtype, np.datetime64):
+        months = days.astype("M8[M]")
+        y = days.astype("M8[Y]").astype(np.int64) + 1970
+        m = months.astype(np.int64) % 12 + 1
+        d = (days.astype("M8[D]") - months.astype("M8[D]")).astype(np.int64) + 1
+        return (y * 10000 + m * 100 + d).astype(np.int32)
+    return days.astype(np.int64).astype(np.int32)
 
-    def __init__(self):
-        self.all()
 
-    def all(self):
-        today = datetime.today().strftime("%Y%m%d")
-        end_year = int(today[:4]) + 5
-        self._all = [i.strftime("%Y%m%d") for i in pd.date_range(start="19900101", end=f"{end_year}1231")]
+def to_date64(days) -> np.ndarray:
+    """int yyyymmdd array -> datetime64[D] array"""
+    days = np.asarray(days, dtype=np.int64)
+    months = (days // 10000 - 1970) * 12 + days // 100 % 100 - 1
+    return months.astype("M8[M]").astype("M8[D]") + (days % 100 - 1)
 
-    def offset(self, day, delta):
-        if day not in self._all:
+
+class NaturalDay:
+    """
+        One shared instance per class, days are loaded on first use and kept
+        as a sorted int32 yyyymmdd array (_days), lookups are binary searches.
+    """
+    _instances = {}
+
+    def __new__(cls):
+        instance = NaturalDay._instances.get(cls)
+        if instance is None:
+            instance = NaturalDay._instances.setdefault(cls, super().__new__(cls))
+        return instance
+
+    @cached_property
+    def _days(self) -> np.ndarray:
+        return self.all()
+
+    @cached_property
+    def _view(self) -> memoryview:
+        # bisect on a memoryview beats np.searchsorted for a single scalar
+        return memoryview(self._days)
+
+    def all(self) -> np.ndarray:
+        end_year = datetime.today().year + 5
+        return to_ymd(np.arange(np.datetime64("1990-01-01"), np.datetime64(f"{end_year + 1}-01-01")))
+
+    def locate(self, day):
+        value = int(day)
+        index = bisect_left(self._view, value)
+        if index == len(self._view) or self._view[index] != value:
             raise Exception(f"{day} not in tradingdays")
-        index = self._all.index(day) + delta
-        return self._all[index]
+        return index
+
+    def offset(self, day, delta):
+        index = self.locate(day) + delta
+        return str(self._view[index])
 
     def get_next(self, day):
         return self.offset(day, 1)
@@ -29,14 +71,14 @@ class NaturalDay:
     def get_pre(self, day):
         return self.offset(day, -1)
 
+    def get_last_before(self, day):
+        """last day in calendar <= day, day need not be in calendar"""
+        index = bisect_right(self._view, int(day)) - 1
+        return str(self._view[index]) if index >= 0 else None
+
     def get_month_end(self, day):
-        index = self._all.index(day)
-        month_end = day
-        for date in self._all[index:]:
-            if day[:6] == date[:6]:
-                month_end = date
-            else:
-                return month_end
+        self.locate(day)
+        return self.get_last_before(day[:6] + "31")
 
     def is_month_end(self, day):
         next_day = self.get_next(day)
@@ -55,26 +97,97 @@ class NaturalDay:
         return False
 
     def get_week_end(self, day):
-        index = self._all.index(day)
-        week_end = day
-        for date in self._all[index:]:
-            if self.calc_weekday(date) < 5:
-                week_end = date
-            else:
-                return week_end
+        self.locate(day)
+        week = self.calc_weekday(day)
+        if week > 4:
+            return day
+        friday = datetime.strptime(day, "%Y%m%d") + timedelta(days=4 - week)
+        return self.get_last_before(friday.strftime("%Y%m%d"))
+
+    def is_week_end(self, day):
+        return self.get_week_end(day) == day
+
+    # range queries, slices of _days are views, nothing is copied
+    def get_range(self, start, end) -> np.ndarray:
+        """int32 yyyymmdd days in [start, end]"""
+        return self._days[bisect_left(self._view, int(start)):bisect_right(self._view, int(end))]
+
+    def get_month_days(self, month) -> np.ndarray:
+        """int32 yyyymmdd days of month yyyymm"""
+        return self.get_range(f"{month}01", f"{month}31")
+
+    def get_nth_of_month(self, month, n):
+        """n-th day of month yyyymm, 1-based, negative counts from month end"""
+        days = self.get_month_days(month)
+        if n == 0 or abs(n) > len(days):
+            return None
+        return str(days[n - 1 if n > 0 else n])
+
+    def count(self, start, end):
+        """number of calendar days in (start, end], negative when end < start"""
+        return bisect_right(self._view, int(end)) - bisect_right(self._view, int(start))
+
+    # batch versions, take array / Series of dates and return np.ndarray
+    def batch_locate(self, days) -> np.ndarray:
+        days = to_ymd(days)
+        index = np.searchsorted(self._days, days)
+        found = self._days[np.minimum(index, len(self._days) - 1)] == days
+        if not found.all():
+            raise Exception(f"{days[~found][0]} not in tradingdays")
+        return index
+
+    def batch_offset(self, days, delta) -> np.ndarray:
+        index = self.batch_locate(days) + delta
+        if len(index) and (index.min() < 0 or index.max() >= len(self._days)):
+            raise IndexError("offset out of calendar range")
+        return self._days[index].astype("U8")
+
+    def batch_month_end(self, days) -> np.ndarray:
+        index = self.batch_locate(days)
+        month_end = self._days[index] // 100 * 100 + 31
+        return self._days[np.searchsorted(self._days, month_end, side="right") - 1].astype("U8")
+
+    def batch_is_month_end(self, days) -> np.ndarray:
+        index = self.batch_locate(days)
+        return self._days[index] // 100 != self._days[index + 1] // 100
+
+    def batch_calc_weekday(self, days) -> np.ndarray:
+        return (to_date64(to_ymd(days)).astype(np.int64) + 3) % 7
+
+    def batch_week_end(self, days) -> np.ndarray:
+        index = self.batch_locate(days)
+        days = self._days[index]
+        week = self.batch_calc_weekday(days)
+        friday = to_ymd(to_date64(days) + (4 - week))
+        week_end = self._days[np.searchsorted(self._days, friday, side="right") - 1]
+        return np.where(week > 4, days, week_end).astype("U8")
+
+    def batch_is_week_end(self, days) -> np.ndarray:
+        days = to_ymd(days)
+        return self.batch_week_end(days).astype(np.int32) == days
+
+    def batch_count(self, start, end) -> np.ndarray:
+        """number of calendar days in (start, end], negative when end < start"""
+        start = np.searchsorted(self._days, to_ymd(start), side="right")
+        end = np.searchsorted(self._days, to_ymd(end), side="right")
+        return end - start
 
 
 class CN_TradingDay(NaturalDay):
 
-    def __init__(self):
-        self.all()
+    tradingday_file = os.path.join(calendar_path, "cn_tradingday.txt")
+    sidecar_file = os.path.join(calendar_path, "cn_tradingday.npy")
+
+    def all(self) -> np.ndarray:
+        if os.path.exists(self.sidecar_file) and os.path.getmtime(self.sidecar_file) >= os.path.getmtime(self.tradingday_file):
+            return np.load(self.sidecar_file, mmap_mode="r")
+        with open(self.tradingday_file, "r") as f:
+            return np.array(f.read().split(), dtype=np.int32)
 
-    def all(self):
-        self._all = []
-        tradingday_file = os.path.join(calendar_path, "cn_tradingday.txt")
-        with open(tradingday_file, "r") as f:
-            for line in f:
-                self._all.append(line.strip())
+    def build_sidecar(self):
+        """dump cn_tradingday.txt to a binary .npy that all() memory-maps"""
+        with open(self.tradingday_file, "r") as f:
+            np.save(self.sidecar_file, np.array(f.read().split(), dtype=np.int32))
 
 
 if __name__ == "__main__":